@@ -15,23 +15,22 @@ Original features:
 - Search and replace
 """
 
-import json
 import textwrap
 import datetime
-import traceback
 import os
 import logging
 import colorsys
 from typing import List, Dict, Optional, Tuple, Set
 from copy import deepcopy
-import atexit
 import platform
 import re
 import sys
 import time
 import uuid
-from collections import Counter
+import hashlib
+from collections import Counter, deque
 
+import numpy as np
 import streamlit as st
 from pyvis.network import Network
 import streamlit.components.v1 as components
@@ -40,20 +39,28 @@ import streamlit.components.v1 as components
 from src.config import (
     DATA_FILE, DEFAULT_SETTINGS, NETWORK_CONFIG,
     CANVAS_DIMENSIONS, PRIMARY_NODE_BORDER, RGBA_ALPHA,
-    ERROR_MESSAGES
+    ERROR_MESSAGES, SAVE_DEBOUNCE_SECONDS, QUEUE_RERUN_INTERVAL, QUEUE_RERUN_MAX_PENDING,
+    NODE_LIST_PAGE_SIZE
 )
 from src.state import (
-    get_store, get_ideas, get_central, get_next_id, increment_next_id, get_current_theme,
-    set_ideas, add_idea, set_central, set_current_theme, save_data, load_data
+    get_store, get_ideas, get_ideas_version, get_central, get_next_id, increment_next_id, get_current_theme,
+    set_ideas, add_idea, set_central, set_current_theme, save_data, load_data,
+    get_node_positions, get_node_columns, get_encoded_node_positions, get_children_index, get_node_index, get_label_index,
+    get_search_index, has_pending_save, flush_pending_save
 )
 from src.history import save_state_to_history, can_undo, can_redo, perform_undo, perform_redo
-from src.utils import hex_to_rgb, get_theme, recalc_size, get_edge_color, get_urgency_color, get_tag_color, collect_descendants, find_node_by_id, find_closest_node
+from src.utils import hex_to_rgb, get_theme, theme_options, tag_option_index, TAG_OPTIONS, THEME_OPTIONS, px_to_int, recalc_size, get_edge_color, get_urgency_color, get_tag_color, collect_descendants, find_node_by_id, find_closest_node, validate_node_exists, build_node_indexes, build_node_columns
 from src.themes import THEMES, TAGS, URGENCY_SIZE
 from src.handlers import handle_message, handle_exception, is_circular
 from src.message_queue import message_queue, MessageQueue, Message
 from src.message_format import Message, validate_message, create_response_message
 from src.logging_setup import get_logger
-from src.node_utils import validate_node, update_node_position
+from src.node_utils import validate_node, update_node_position, update_node_position_service
+from src import json_utils
+from src.canvas_js import (
+    DIRECT_JS, POSITION_APPLY_JS, PAGE_SCRIPTS_HTML, PHYSICS_OFF_AFTER_STABILIZATION_JS, PYVIS_TEMPLATE_ENV,
+    outbox_html, server_positions_html
+)
 
 # Configure logging
 import os
@@ -142,6 +149,10 @@ if 'store' not in st.session_state:
     persisted_data = load_data()
     logger.info("Loading persisted data for new session")
     if persisted_data:
+        # Nodes saved without a size get one once here; Add, Edit, Import and
+        # set_ideas keep it current afterwards
+        for n in persisted_data.get('ideas', []):
+            recalc_size(n)
         st.session_state['store'] = persisted_data
         logger.info(f"Loaded data with {len(persisted_data.get('ideas', []))} nodes")
         # Update session state with canvas expansion setting if available
@@ -164,6 +175,523 @@ if 'store' not in st.session_state:
         get_store()['settings'] = DEFAULT_SETTINGS.copy()
         logger.info("Initialized default settings")
 
+# ---------------- Message handlers ----------------
+
+def _find_clicked_node(action, payload, ideas):
+    """Find the node under a canvas click, if any.
+    
+    Args:
+        action: Canvas action name (used for logging)
+        payload: Message payload with x/y and canvas dimensions
+        ideas: Current list of nodes
+        
+    Returns:
+        ID of the clicked node, or None if no node is within the click threshold
+    """
+    # Process the coordinates
+    click_x = payload.get('x', 0)
+    click_y = payload.get('y', 0)
+    canvas_width = payload.get('canvasWidth', 800)
+    canvas_height = payload.get('canvasHeight', 600)
+    
+    # Store the coordinates in session state
+    st.session_state.last_click_coords = {
+        'x': click_x,
+        'y': click_y,
+        'canvasWidth': canvas_width,
+        'canvasHeight': canvas_height,
+        'timestamp': payload.get('timestamp', datetime.datetime.now().timestamp() * 1000)
+    }
+    
+    logger.info("Canvas %s at coordinates: (%s, %s)", action, click_x, click_y)
+    
+    # Get all nodes with stored positions (cached until the ideas change)
+    position_arrays = get_node_positions()
+    nodes_with_pos = position_arrays['nodes']
+    
+    # Debug logging
+    logger.info("Total nodes: %d, Nodes with positions: %d", len(ideas), len(nodes_with_pos))
+    
+    if not nodes_with_pos:
+        return None
+    
+    # Use utility function to find the closest node
+    closest_node, min_distance, click_threshold = find_closest_node(
+        nodes_with_pos, click_x, click_y, canvas_width, canvas_height,
+        positions=position_arrays
+    )
+    
+    if closest_node:
+        logger.info("Closest node: %s (%s) at distance %.2f, threshold: %.2f",
+                    closest_node['id'], closest_node.get('label', 'Untitled Node'), min_distance, click_threshold)
+    
+    if closest_node and min_distance < click_threshold:
+        logger.info("Node %s is within threshold - processing %s", closest_node['id'], action)
+        return closest_node['id']
+    
+    if closest_node:
+        logger.warning(f"No node found near click coordinates (closest: {closest_node.get('label', 'Untitled Node')} at distance: {min_distance:.2f}, threshold: {click_threshold:.2f})")
+    else:
+        logger.warning(f"No nodes found near click coordinates")
+    return None
+
+def _handle_canvas_click(node_id, ideas):
+    """Regular click - select and center the node.
+    
+    Returns:
+        True if the central node changed (the graph needs redrawing)
+    """
+    st.session_state.selected_node = node_id
+    st.session_state.show_node_details = True
+    changed = get_central() != node_id
+    if changed:
+        set_central(node_id)
+        # Canvas messages end in a full page reload (a new session), so a
+        # debounced save would be lost; write it now
+        save_data(get_store())
+    logger.info("Selected and centered node %s", node_id)
+    return changed
+
+def _handle_canvas_dblclick(node_id, ideas):
+    """Double-click - edit the node."""
+    st.session_state['edit_node'] = node_id
+    logger.info("Opening edit modal for node %s", node_id)
+    return True
+
+def _handle_canvas_delete(node_id, ideas):
+    """Right-click - delete the node (and its descendants)."""
+    logger.info("Deleting node %s", node_id)
+    
+    # Save state before deletion
+    save_state_to_history()
+    
+    # Remove node and its descendants using utility function
+    to_remove = collect_descendants(node_id, ideas, children_index=get_children_index())
+    
+    # Filter and pick a replacement central node in one pass
+    new_ideas = []
+    new_central = None
+    for n in ideas:
+        if n.get('id') in to_remove:
+            continue
+        new_ideas.append(n)
+        if new_central is None:
+            new_central = n.get('id')
+    set_ideas(new_ideas)
+    
+    # Update central node if needed
+    if get_central() in to_remove:
+        set_central(new_central)
+    
+    save_data(get_store())
+    logger.info("Deleted node %s and %d descendants", node_id, len(to_remove) - 1)
+    return True
+
+# Node actions for canvas messages, keyed by action name; each returns
+# whether the page needs a rerun to reflect the change
+_CANVAS_NODE_ACTIONS = {
+    'canvas_click': _handle_canvas_click,
+    'canvas_dblclick': _handle_canvas_dblclick,
+    'canvas_contextmenu': _handle_canvas_delete
+}
+
+def _handle_canvas_message(action, payload, ideas, current_time):
+    """Handle canvas coordinate-based messages."""
+    logger.info("Processing canvas interaction: %s", action)
+    
+    # The graph and the widgets above this handler were already rendered
+    # on this pass. A click only needs a rerun when it moves the central
+    # node (the graph highlights it); the node details are drawn below
+    needs_rerun = action != 'canvas_click'
+    
+    # For click/dblclick/contextmenu actions, act on the nearest node
+    node_action = _CANVAS_NODE_ACTIONS.get(action)
+    if node_action is not None and 'x' in payload and 'y' in payload:
+        node_id = _find_clicked_node(action, payload, ideas)
+        if node_id is not None:
+            needs_rerun = node_action(node_id, ideas)
+        elif action != 'canvas_click':
+            # Show warning message if action failed
+            logger.error(f"Canvas action {action} failed at coordinates ({payload.get('x', 0):.1f}, {payload.get('y', 0):.1f})")
+    
+    # Store message info in session state to confirm processing 
+    st.session_state.last_processed_message = {
+        'action': action,
+        'payload': payload,
+        'time': current_time
+    }
+    
+    if needs_rerun:
+        st.rerun()
+
+def _handle_position_message(action, payload, ideas, current_time):
+    """Handle a node position update."""
+    logger.info("💥 POSITION UPDATE MESSAGE RECEIVED: %s", payload)
+    
+    if 'id' not in payload or 'x' not in payload or 'y' not in payload:
+        logger.error(f"❌ Invalid position update payload: {payload}")
+        return
+    
+    node_id = payload['id']
+    x = payload['x']
+    y = payload['y']
+    
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("⭐ POSITION DEBUG: Processing update for node %s to (%s, %s) of types (x: %s, y: %s)",
+                    node_id, x, y, type(x).__name__, type(y).__name__)
+    
+    # Use the centralized position update service
+    try:
+        result = update_node_position_service(
+            node_id=node_id, 
+            x=x, 
+            y=y, 
+            get_ideas_func=get_ideas,
+            set_ideas_func=set_ideas,
+            save_state_func=save_state_to_history,
+            # Written immediately: the reload that delivered this message
+            # starts a new session, which would drop a debounced save
+            save_data_func=save_data,
+            get_store_func=get_store
+        )
+    except Exception as e:
+        logger.error(f"❌ Error updating position: {str(e)}", exc_info=True)
+        return
+    
+    if result['success']:
+        logger.info("💾 POSITION UPDATE SUCCESS: %s", result['message'])
+        st.rerun()
+    else:
+        logger.warning(f"❌ POSITION UPDATE FAILED: {result['message']}")
+
+def _handle_position_batch_message(action, payload, ideas, current_time):
+    """Handle position updates for several nodes, sent together as one message."""
+    positions = payload.get('positions') if isinstance(payload, dict) else None
+    if not isinstance(positions, list):
+        logger.error(f"❌ Invalid position batch payload: {payload}")
+        return
+    
+    logger.info("💥 POSITION BATCH RECEIVED: %d nodes", len(positions))
+    
+    # Index the nodes once for the whole batch; ids that only match after
+    # type coercion (e.g. '3' for 3) still go through validate_node_exists
+    node_by_id, _ = build_node_indexes(ideas)
+    updated = 0
+    for entry in positions:
+        if not isinstance(entry, dict) or 'id' not in entry or 'x' not in entry or 'y' not in entry:
+            logger.warning(f"❌ Skipping invalid position entry: {entry}")
+            continue
+        
+        node = node_by_id.get(entry['id'])
+        if node is None:
+            success, node, error_msg = validate_node_exists(entry['id'], ideas, 'position update')
+            if not success:
+                logger.warning(error_msg)
+                continue
+        
+        update_node_position(node, entry['x'], entry['y'])
+        updated += 1
+    
+    if not updated:
+        logger.warning("❌ POSITION BATCH FAILED: no nodes updated")
+        return
+    
+    # One history entry, one ideas update and one save for the batch
+    try:
+        save_state_to_history()
+        set_ideas(ideas)
+        save_data(get_store())
+    except Exception as e:
+        logger.error(f"❌ Error saving position batch: {str(e)}", exc_info=True)
+        return
+    
+    logger.info("💾 POSITION BATCH SUCCESS: %d of %d nodes updated", updated, len(positions))
+    st.rerun()
+
+# Message handlers for query-parameter messages, keyed by action name;
+# any other 'canvas_*' action falls back to _handle_canvas_message
+_ACTION_HANDLERS = {
+    'canvas_click': _handle_canvas_message,
+    'canvas_dblclick': _handle_canvas_message,
+    'canvas_contextmenu': _handle_canvas_message,
+    'pos': _handle_position_message,
+    'pos_batch': _handle_position_batch_message
+}
+
+def _export_position(node):
+    """Return a node's (x, y) as floats, falling back to (0.0, 0.0) when missing or invalid."""
+    x, y = node.get('x'), node.get('y')
+    if x is None or y is None:
+        logger.warning(f"Missing position data in export for node {node.get('id')}, initializing to (0,0)")
+        return 0.0, 0.0
+    try:
+        return float(x), float(y)
+    except (ValueError, TypeError):
+        logger.warning(f"Invalid position values in export for node {node.get('id')}, resetting to (0,0)")
+        return 0.0, 0.0
+
+def _build_export_bytes(ideas, central_id):
+    """Serialize the nodes for the Export JSON download as indented UTF-8 bytes.
+
+    Each node is emitted as a fresh dict carrying its is_central flag and
+    float coordinates, so the stored nodes are never copied or mutated.
+    """
+    export = []
+    for item in ideas:
+        x, y = _export_position(item)
+        export.append({**item, 'is_central': item.get('id') == central_id, 'x': x, 'y': y})
+    logger.info(f"Prepared export of {len(export)} nodes")
+    if logger.isEnabledFor(logging.DEBUG):
+        for item in export:
+            logger.debug(f"  Node {item.get('id')} ({item.get('label')}): ({item['x']}, {item['y']})")
+    return json_utils.dumps_bytes(export, indent=2)
+
+def _read_log_file(path):
+    """Contents of a log file."""
+    with open(path, 'r') as f:
+        return f.read()
+
+def _read_previous_log(path):
+    """Contents of a previous session's log, cached in session_state.
+    
+    Only the last log read is kept, keyed on its path and mtime, so picking
+    another log or a changed file reads it again.
+    """
+    key = (path, os.stat(path).st_mtime_ns)
+    cached = st.session_state.get('_previous_log')
+    if cached is None or cached[0] != key:
+        cached = (key, _read_log_file(path))
+        st.session_state['_previous_log'] = cached
+    return cached[1]
+
+def _insert_before_body_close(html, *parts):
+    """Insert parts right before the closing </body> tag (appending them if there is none).
+    
+    The tag is searched for from the end of the document, where it sits, and
+    the result is assembled with a single join.
+    """
+    body_end = html.rfind('</body>')
+    if body_end == -1:
+        return ''.join((html, *parts))
+    return ''.join((html[:body_end], *parts, html[body_end:]))
+
+def _build_network_html(ideas, central_id, canvas_height, spring_strength, edge_length, size_multiplier):
+    """Build the PyVis network HTML for the canvas, with window.visNetwork exposed.
+    
+    The position data and page scripts are spliced in by the caller.
+    """
+    theme = get_theme()
+    
+    # Create network with transparent background for seamless integration
+    net = Network(
+        height=canvas_height, 
+        width="100%", 
+        directed=True, 
+        bgcolor=theme['background'],
+        font_color=theme.get('text_color', '#333333'),
+        select_menu=False,  # Remove the default right-click menu
+        filter_menu=False,  # Remove the filter menu
+        cdn_resources='local'  # Use local resources for better loading
+    )
+
+    # Configure physics using centralized settings
+    net.barnes_hut(
+        gravity=NETWORK_CONFIG['gravity'],
+        central_gravity=NETWORK_CONFIG['central_gravity'],
+        spring_length=NETWORK_CONFIG['spring_length'],
+        spring_strength=spring_strength,
+        damping=NETWORK_CONFIG['damping'],
+        overlap=NETWORK_CONFIG['overlap']
+    )
+    # Cap the work done to stabilize the layout on load
+    physics = net.options.physics
+    physics.stabilization.iterations = NETWORK_CONFIG['stabilization_iterations']
+    physics.minVelocity = NETWORK_CONFIG['min_velocity']
+    physics.timestep = NETWORK_CONFIG['timestep']
+
+    # Add nodes and edges to the network (nodes without an id are skipped),
+    # reading the node fields from parallel per-field lists rather than a
+    # dozen dict lookups per node; for the store's ideas the lists are cached
+    # until the ideas change, so a rebuild for new settings reuses them
+    columns = get_node_columns() if ideas is get_ideas() else build_node_columns(ideas)
+    color_mode = get_store().get('settings', {}).get('color_mode', 'urgency')
+    
+    logger.info("Creating nodes with central node ID: %s", central_id)
+    
+    # Display sizes for all nodes in one pass: the size multiplier makes
+    # urgency differences more noticeable, and the central node is 1.5x
+    urgencies = np.array(columns['urgencies'], dtype=object)
+    is_central = np.array([node_id == central_id for node_id in columns['ids']], dtype=bool)
+    sizes = np.array(columns['sizes'], dtype=np.float64)
+    sizes = np.where(urgencies == 'high', sizes * size_multiplier,
+                     np.where(urgencies == 'low', sizes / size_multiplier, sizes))
+    sizes = np.where(is_central, sizes * 1.5, sizes)
+    
+    # (background, border) RGBA strings per tag or urgency, looked up and
+    # formatted once per distinct value rather than once per node
+    rgba_by_color_key = {}
+    
+    # Node option dicts in the form PyVis's add_node() builds them, and the
+    # edges from each node's parent, built in the same pass; both are handed
+    # to the network in one go below
+    node_map = {}
+    edges = []
+    node_ids = set(columns['ids'])
+    
+    # Each edge type the theme knows maps to its (type, color) pair once;
+    # unknown types fall back to 'default'
+    edge_styles = {edge_type: (edge_type, get_edge_color(edge_type)) for edge_type in theme['edge_colors']}
+    default_edge_style = edge_styles.get('default', ('default', get_edge_color('default')))
+    
+    for node_id, label, title, tag, urgency, pid, edge_type, x, y, size_px, central in zip(
+            columns['ids'], columns['labels'], columns['titles'], columns['tags'],
+            columns['color_urgencies'], columns['parents'], columns['edge_types'],
+            columns['xs'], columns['ys'], sizes.tolist(), is_central.tolist()):
+        # Set color based on tag or urgency depending on color mode
+        if color_mode == 'tag' and tag:
+            # Use tag color if available
+            color_key = ('tag', tag)
+        else:
+            # Fall back to urgency color
+            color_key = ('urgency', urgency)
+        rgba = rgba_by_color_key.get(color_key)
+        if rgba is None:
+            color_hex = get_tag_color(tag) if color_key[0] == 'tag' else get_urgency_color(urgency)
+            r, g, b = hex_to_rgb(color_hex)
+            rgba = rgba_by_color_key[color_key] = (f"rgba({r},{g},{b},{RGBA_ALPHA})", f"rgba({r},{g},{b},1)")
+        bg, bd = rgba
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Node %s: color %s (tag='%s', urgency='%s', mode='%s')",
+                         node_id, bg, tag or '', urgency, color_mode)
+        
+        # Apply special highlighting for central node
+        if central:
+            bd = "#FF5722"  # Bright orange border
+            border_width = 3  # Thicker border
+            logger.info("Applying special highlighting to central node %s", node_id)
+        else:
+            border_width = 1
+
+        options = {
+            'color': {'background': bg, 'border': bd},
+            'title': title,
+            'size': size_px,
+            'borderWidth': border_width
+        }
+
+        if x is not None and y is not None:
+            options.update(x=x, y=y)
+
+        # As add_node(): an empty label shows the id, and the first node with
+        # a given id wins
+        options.update(id=node_id, label=label or node_id)
+        node_map.setdefault(node_id, options)
+        
+        # Edge from the parent, if the parent is on the map
+        if pid in node_ids:
+            edge_type, edge_color = edge_styles.get(edge_type, default_edge_style)
+            edges.append({'color': edge_color, 'title': edge_type, 'from': pid, 'to': node_id})
+
+    # Set the nodes and edges directly: add_node() and add_edge() check ids
+    # against lists, which is quadratic in the size of the map
+    net.nodes = list(node_map.values())
+    net.node_ids = list(node_map)
+    net.node_map = node_map
+    net.edges = edges
+
+    # Options shared by every node and edge are set once for the network
+    # rather than repeated in each item; unfixed nodes are vis.js's default
+    net.options.nodes = {'shape': 'circle'}
+    if net.font_color:
+        net.options.nodes['font'] = {'color': net.font_color}
+    net.options.edges.arrows = 'to'
+    net.options.edges.length = edge_length
+
+    # Generate PyVis HTML with modified network code to ensure accessibility
+    net.templateEnv = PYVIS_TEMPLATE_ENV
+    html_content = net.generate_html()
+    
+    # Create simplified HTML with direct network object access
+    modified_html = html_content.replace(
+        'var network = new vis.Network(',
+        'window.visNetwork = new vis.Network('
+    )
+    
+    # Add additional hook to ensure network is accessible globally
+    modified_html = modified_html.replace(
+        '</script>',
+        '''
+        // Add hook to ensure visNetwork is available
+        if (typeof network !== 'undefined' && !window.visNetwork) {
+            console.log('Setting window.visNetwork from local network variable');
+            window.visNetwork = network;
+        }
+        
+        // Debug that will run after network creation
+        setTimeout(function() {
+            console.log('Network object availability check:');
+            console.log('- window.visNetwork available:', window.visNetwork !== undefined);
+            if (!window.visNetwork) {
+                console.log('Searching for network in canvases...');
+                var networkDiv = document.getElementById('mynetwork');
+                if (networkDiv) {
+                    var canvases = networkDiv.querySelectorAll('canvas');
+                    for (var i = 0; i < canvases.length; i++) {
+                        if (canvases[i].network) {
+                            console.log('Found network in canvas, setting as window.visNetwork');
+                            window.visNetwork = canvases[i].network;
+                            break;
+                        }
+                    }
+                }
+            }
+        }, 1000);
+        </script>'''
+    )
+    
+    # Large maps stop simulating once laid out, so the browser doesn't keep
+    # running physics for every node. Inserted after the hook above, which
+    # must only follow PyVis's own script blocks
+    if len(columns['ids']) > NETWORK_CONFIG['physics_off_node_threshold']:
+        modified_html = _insert_before_body_close(modified_html, PHYSICS_OFF_AFTER_STABILIZATION_JS)
+    
+    return modified_html
+
+def _on_theme_change():
+    """Apply the theme picked in the Settings selectbox."""
+    selected_theme = st.session_state['theme_select']
+    set_current_theme(selected_theme)
+    logger.info(f"Theme changed to: {selected_theme}")
+
+# Page styles, one <style> block per theme so each rerun emits a single
+# markdown element for them
+_CANVAS_FRAME_RULE = """
+        /* Remove canvas frame */
+        iframe {
+            border: none !important;
+            box-shadow: none !important;
+            background-color: transparent !important;
+        }
+"""
+# Better button alignment in the Node List columns
+_NODE_LIST_BUTTON_RULE = """
+        div[data-testid="column"] > div > div > div > div > div[data-testid="stButton"] > button {
+            width: 100%;
+            padding: 0px 5px;
+            display: flex;
+            justify-content: center;
+        }
+"""
+FRAMELESS_CANVAS_CSS = "<style>" + _CANVAS_FRAME_RULE + _NODE_LIST_BUTTON_RULE + "</style>"
+DARK_THEME_CSS = """<style>
+        .stApp {
+            background-color: #2E3440;
+            color: #D8DEE9;
+        }
+        .stSidebar {
+            background-color: #3B4252;
+        }""" + _CANVAS_FRAME_RULE + _NODE_LIST_BUTTON_RULE + "</style>"
+
 # ---------------- Main App ----------------
 try:
     st.set_page_config(page_title="Enhanced Mind Map", layout="wide")
@@ -226,47 +754,28 @@ try:
     # Insert the message recovery script
     st.components.v1.html(message_recovery_js, height=0)
 
-    # Apply theme to page
+    # Apply theme to page. The page CSS is one markdown element per theme,
+    # emitted on every rerun for the same reason as the canvas component
+    # (see the note where it is rendered)
     current_theme = get_current_theme()
     if current_theme == 'dark':
-        st.markdown("""
-        <style>
-        .stApp {
-            background-color: #2E3440;
-            color: #D8DEE9;
-        }
-        .stSidebar {
-            background-color: #3B4252;
-        }
-        /* Remove canvas frame */
-        iframe {
-            border: none !important;
-            box-shadow: none !important;
-            background-color: transparent !important;
-        }
-        </style>
-        """, unsafe_allow_html=True)
+        st.markdown(DARK_THEME_CSS, unsafe_allow_html=True)
     else:
         # For light theme, only remove the frame but keep the theme
-        st.markdown("""
-        <style>
-        /* Remove canvas frame */
-        iframe {
-            border: none !important;
-            box-shadow: none !important;
-            background-color: transparent !important;
-        }
-        </style>
-        """, unsafe_allow_html=True)
+        st.markdown(FRAMELESS_CANVAS_CSS, unsafe_allow_html=True)
 
     st.title("🧠 Enhanced Mind Map")
 
     # Sidebar Theme Selection
     with st.sidebar.expander("Settings", expanded=False):
-        selected_theme = st.selectbox(
+        # The theme is applied by the change callback, before the rerun that
+        # renders the page, so switching themes needs no second rerun
+        st.session_state['theme_select'] = get_current_theme()
+        st.selectbox(
             "Select Theme",
-            options=list(THEMES.keys()),
-            index=list(THEMES.keys()).index(get_current_theme())
+            options=THEME_OPTIONS,
+            key='theme_select',
+            on_change=_on_theme_change
         )
         
         # Get settings with defaults
@@ -275,44 +784,178 @@ try:
         default_spring_strength = settings.get('spring_strength', DEFAULT_SETTINGS['spring_strength'])
         default_size_multiplier = settings.get('size_multiplier', DEFAULT_SETTINGS['size_multiplier'])
         
-        # Add connection length slider
-        edge_length = st.slider(
-            "Connection Length", 
-            min_value=50, 
-            max_value=300, 
-            value=default_edge_length,
-            step=10,
-            help="Adjust the length of connections between nodes"
-        )
+        # Get custom colors or use defaults
+        custom_colors = settings.get('custom_colors', DEFAULT_SETTINGS['custom_colors'])
+        # Get existing custom tags
+        custom_tags = settings.get('custom_tags', [])
         
-        # Add spring strength slider
-        spring_strength = st.slider(
-            "Connection Strength",
-            min_value=0.1,
-            max_value=1.0,
-            value=default_spring_strength,
-            step=0.1,
-            help="Adjust how strongly connected nodes pull together (higher = tighter grouping)"
-        )
+        # Layout and color settings are applied together on submit instead of
+        # rerunning the script for every slider or picker change
+        with st.form("settings_form"):
+            # Add connection length slider
+            edge_length = st.slider(
+                "Connection Length", 
+                min_value=50, 
+                max_value=300, 
+                value=default_edge_length,
+                step=10,
+                help="Adjust the length of connections between nodes"
+            )
         
-        # Add size multiplier for urgency differences
-        size_multiplier = st.slider(
-            "Urgency Size Impact",
-            min_value=1.0,
-            max_value=3.0,
-            value=default_size_multiplier,
-            step=0.2,
-            help="Enhance the size difference between urgency levels (higher = more pronounced difference)"
-        )
+            # Add spring strength slider
+            spring_strength = st.slider(
+                "Connection Strength",
+                min_value=0.1,
+                max_value=1.0,
+                value=default_spring_strength,
+                step=0.1,
+                help="Adjust how strongly connected nodes pull together (higher = tighter grouping)"
+            )
         
-        # Get custom colors or use defaults
-        custom_colors = settings.get('custom_colors', DEFAULT_SETTINGS['custom_colors'])
+            # Add size multiplier for urgency differences
+            size_multiplier = st.slider(
+                "Urgency Size Impact",
+                min_value=1.0,
+                max_value=3.0,
+                value=default_size_multiplier,
+                step=0.2,
+                help="Enhance the size difference between urgency levels (higher = more pronounced difference)"
+            )
+        
+            # Color customization section
+            st.markdown("### Color Customization")
+        
+            # Add color mode toggle
+            color_mode = settings.get('color_mode', DEFAULT_SETTINGS['color_mode'])
+            new_color_mode = st.radio(
+                "Node Color Mode",
+                options=["Urgency", "Tag"],
+                index=0 if color_mode == 'urgency' else 1,
+                horizontal=True,
+                help="Choose whether to color nodes based on urgency level or tag"
+            )
+            # Convert display name to config value
+            new_color_mode = new_color_mode.lower()
+        
+            # Add explanation of current mode
+            if new_color_mode == 'urgency':
+                st.info("Nodes are colored by urgency level (high, medium, low).")
+            else:
+                st.info("Nodes are colored by their assigned tag. Nodes without tags will use urgency colors.")
+        
+            # Color tabs for urgency and tags
+            active_tab = 0 if new_color_mode == 'urgency' else 1
+            color_tab1, color_tab2 = st.tabs(["Urgency Colors", "Tag Colors"])
+        
+            # Urgency color pickers
+            with color_tab1:
+                urgency_colors = custom_colors.get('urgency', DEFAULT_SETTINGS['custom_colors']['urgency'])
+            
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    high_color = st.color_picker(
+                        "High Urgency", 
+                        urgency_colors.get('high', DEFAULT_SETTINGS['custom_colors']['urgency']['high']),
+                        help="Color for high urgency nodes"
+                    )
+                with col2:
+                    medium_color = st.color_picker(
+                        "Medium Urgency", 
+                        urgency_colors.get('medium', DEFAULT_SETTINGS['custom_colors']['urgency']['medium']),
+                        help="Color for medium urgency nodes"
+                    )
+                with col3:
+                    low_color = st.color_picker(
+                        "Low Urgency", 
+                        urgency_colors.get('low', DEFAULT_SETTINGS['custom_colors']['urgency']['low']),
+                        help="Color for low urgency nodes"
+                    )
+            
+                # Update urgency colors if changed
+                if (high_color != urgency_colors.get('high') or 
+                    medium_color != urgency_colors.get('medium') or 
+                    low_color != urgency_colors.get('low')):
+                    custom_colors['urgency'] = {
+                        'high': high_color,
+                        'medium': medium_color,
+                        'low': low_color
+                    }
+        
+            # Tag color pickers
+            with color_tab2:
+                tag_colors = custom_colors.get('tags', DEFAULT_SETTINGS['custom_colors']['tags'])
+            
+                # Get all tags (built-in only)
+                builtin_tags = TAG_OPTIONS[1:]
+            
+                st.markdown("#### Built-in Tags")
+            
+                # Create 2 columns for built-in tag colors
+                tag_col1, tag_col2 = st.columns(2)
+            
+                half_length = len(builtin_tags) // 2 + len(builtin_tags) % 2
+            
+                # First column of built-in tags
+                with tag_col1:
+                    for tag in builtin_tags[:half_length]:
+                        tag_color = st.color_picker(
+                            f"{tag.capitalize()}", 
+                            tag_colors.get(tag, TAGS[tag]['color']),
+                            help=f"Color for {tag} tag"
+                        )
+                        # Update if changed
+                        if tag_color != tag_colors.get(tag):
+                            tag_colors[tag] = tag_color
+            
+                # Second column of built-in tags
+                with tag_col2:
+                    for tag in builtin_tags[half_length:]:
+                        tag_color = st.color_picker(
+                            f"{tag.capitalize()}", 
+                            tag_colors.get(tag, TAGS[tag]['color']),
+                            help=f"Color for {tag} tag"
+                        )
+                        # Update if changed
+                        if tag_color != tag_colors.get(tag):
+                            tag_colors[tag] = tag_color
+            
+                # Note about custom tags
+                st.info("Custom tag colors can be changed in the Tag Management section below.")
+            
+                # Update tag colors
+                custom_colors['tags'] = tag_colors
+            
+            st.form_submit_button("Apply")
+        
+        # Save all settings if changed. The pickers edit custom_colors in place
+        # (it aliases the stored settings), so compare one digest of the values
+        # against the one recorded at the last save instead of the store itself
+        settings_sig = hashlib.blake2b(json_utils.dumps_bytes([
+            edge_length, spring_strength, size_multiplier, new_color_mode,
+            custom_tags, custom_colors
+        ]), digest_size=16).digest()
+        prev_settings_sig = st.session_state.get('_settings_sig')
+        st.session_state['_settings_sig'] = settings_sig
+        settings_changed = prev_settings_sig is not None and settings_sig != prev_settings_sig
+        
+        if settings_changed:
+            # Update the store with new settings
+            get_store()['settings'] = {
+                'edge_length': edge_length,
+                'spring_strength': spring_strength,
+                'size_multiplier': size_multiplier,
+                'canvas_expanded': settings.get('canvas_expanded', False),
+                'color_mode': new_color_mode,
+                'custom_tags': custom_tags,
+                'custom_colors': custom_colors
+            }
+            # Written right away: a debounced save would be lost if a canvas
+            # message reloads the page before it is flushed
+            save_data(get_store())
         
         # Custom Tags Management
         st.markdown("### Tag Management")
         
-        # Get existing custom tags
-        custom_tags = settings.get('custom_tags', [])
         
         # Input for adding new custom tags
         new_tag_col1, new_tag_col2 = st.columns([3, 1])
@@ -390,137 +1033,6 @@ try:
                     st.rerun()
         else:
             st.info("No custom tags yet. Add one above.")
-        
-        # Color customization section
-        st.markdown("### Color Customization")
-        
-        # Add color mode toggle
-        color_mode = settings.get('color_mode', DEFAULT_SETTINGS['color_mode'])
-        new_color_mode = st.radio(
-            "Node Color Mode",
-            options=["Urgency", "Tag"],
-            index=0 if color_mode == 'urgency' else 1,
-            horizontal=True,
-            help="Choose whether to color nodes based on urgency level or tag"
-        )
-        # Convert display name to config value
-        new_color_mode = new_color_mode.lower()
-        
-        # Add explanation of current mode
-        if new_color_mode == 'urgency':
-            st.info("Nodes are colored by urgency level (high, medium, low).")
-        else:
-            st.info("Nodes are colored by their assigned tag. Nodes without tags will use urgency colors.")
-        
-        # Color tabs for urgency and tags
-        active_tab = 0 if new_color_mode == 'urgency' else 1
-        color_tab1, color_tab2 = st.tabs(["Urgency Colors", "Tag Colors"])
-        
-        # Urgency color pickers
-        with color_tab1:
-            urgency_colors = custom_colors.get('urgency', DEFAULT_SETTINGS['custom_colors']['urgency'])
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                high_color = st.color_picker(
-                    "High Urgency", 
-                    urgency_colors.get('high', DEFAULT_SETTINGS['custom_colors']['urgency']['high']),
-                    help="Color for high urgency nodes"
-                )
-            with col2:
-                medium_color = st.color_picker(
-                    "Medium Urgency", 
-                    urgency_colors.get('medium', DEFAULT_SETTINGS['custom_colors']['urgency']['medium']),
-                    help="Color for medium urgency nodes"
-                )
-            with col3:
-                low_color = st.color_picker(
-                    "Low Urgency", 
-                    urgency_colors.get('low', DEFAULT_SETTINGS['custom_colors']['urgency']['low']),
-                    help="Color for low urgency nodes"
-                )
-            
-            # Update urgency colors if changed
-            if (high_color != urgency_colors.get('high') or 
-                medium_color != urgency_colors.get('medium') or 
-                low_color != urgency_colors.get('low')):
-                custom_colors['urgency'] = {
-                    'high': high_color,
-                    'medium': medium_color,
-                    'low': low_color
-                }
-        
-        # Tag color pickers
-        with color_tab2:
-            tag_colors = custom_colors.get('tags', DEFAULT_SETTINGS['custom_colors']['tags'])
-            
-            # Get all tags (built-in only)
-            builtin_tags = list(TAGS.keys())
-            
-            st.markdown("#### Built-in Tags")
-            
-            # Create 2 columns for built-in tag colors
-            tag_col1, tag_col2 = st.columns(2)
-            
-            half_length = len(builtin_tags) // 2 + len(builtin_tags) % 2
-            
-            # First column of built-in tags
-            with tag_col1:
-                for tag in builtin_tags[:half_length]:
-                    tag_color = st.color_picker(
-                        f"{tag.capitalize()}", 
-                        tag_colors.get(tag, TAGS[tag]['color']),
-                        help=f"Color for {tag} tag"
-                    )
-                    # Update if changed
-                    if tag_color != tag_colors.get(tag):
-                        tag_colors[tag] = tag_color
-            
-            # Second column of built-in tags
-            with tag_col2:
-                for tag in builtin_tags[half_length:]:
-                    tag_color = st.color_picker(
-                        f"{tag.capitalize()}", 
-                        tag_colors.get(tag, TAGS[tag]['color']),
-                        help=f"Color for {tag} tag"
-                    )
-                    # Update if changed
-                    if tag_color != tag_colors.get(tag):
-                        tag_colors[tag] = tag_color
-            
-            # Note about custom tags
-            st.info("Custom tag colors can be changed in the Tag Management section above.")
-            
-            # Update tag colors
-            custom_colors['tags'] = tag_colors
-        
-        # Save all settings if changed
-        settings_changed = (
-            edge_length != default_edge_length or 
-            spring_strength != default_spring_strength or 
-            size_multiplier != default_size_multiplier or
-            custom_colors != settings.get('custom_colors', {}) or
-            custom_tags != settings.get('custom_tags', []) or
-            new_color_mode != color_mode
-        )
-        
-        if settings_changed:
-            # Update the store with new settings
-            get_store()['settings'] = {
-                'edge_length': edge_length,
-                'spring_strength': spring_strength,
-                'size_multiplier': size_multiplier,
-                'canvas_expanded': settings.get('canvas_expanded', False),
-                'color_mode': new_color_mode,
-                'custom_tags': custom_tags,
-                'custom_colors': custom_colors
-            }
-            save_data(get_store())
-        
-        if selected_theme != get_current_theme():
-            set_current_theme(selected_theme)
-            logger.info(f"Theme changed to: {selected_theme}")
-            st.rerun()
 
     # Sidebar Search
     search_col1, search_col2 = st.sidebar.columns([3, 1])
@@ -534,16 +1046,20 @@ try:
             if ideas:
                 save_state_to_history()
                 count = 0
+                # Match the search case-insensitively, as the filters do; the
+                # replacement is inserted literally (no group references)
+                pattern = re.compile(re.escape(search_q), re.IGNORECASE)
+                replacement = lambda match: replace_q
                 for node in ideas:
-                    if search_q.lower() in node.get('label', 'Untitled Node').lower():
-                        node['label'] = node.get('label', 'Untitled Node').replace(search_q, replace_q)
-                        count += 1
-                    if 'description' in node and search_q.lower() in node['description'].lower():
-                        node['description'] = node['description'].replace(search_q, replace_q)
-                        count += 1
+                    node['label'], n = pattern.subn(replacement, node.get('label', 'Untitled Node'))
+                    count += n
+                    if node.get('description'):
+                        node['description'], n = pattern.subn(replacement, node['description'])
+                        count += n
                 st.sidebar.success(f"Replaced {count} instances")
                 logger.info(f"Search and replace: '{search_q}' to '{replace_q}' - {count} instances replaced")
                 if count > 0:
+                    set_ideas(ideas)
                     save_data(get_store())
                     st.rerun()
 
@@ -552,7 +1068,7 @@ try:
         uploaded = st.file_uploader("Import JSON", type="json")
         if uploaded:
             try:
-                data = json.load(uploaded)
+                data = json_utils.loads(uploaded.getvalue())
                 if not isinstance(data, list):
                     st.error("JSON must be a list")
                     logger.error(f"Import failed: JSON not a list. Filename: {uploaded.name}")
@@ -596,63 +1112,36 @@ try:
 
         ideas = get_ideas()
         if ideas:
-            export = [item.copy() for item in ideas]
-            
-            # Log the positions before export
-            position_info = []
-            for item in export:
-                # Use get() method with a default of None to safely access the id
-                item['is_central'] = (item.get('id') == get_central())
-                
-                # Ensure position values are float and show original values for debugging
-                orig_x = item.get('x')
-                orig_y = item.get('y')
-                
-                # Validate position data exists
-                if 'x' not in item or 'y' not in item or item['x'] is None or item['y'] is None:
-                    logger.warning(f"Missing position data in export for node {item.get('id')}, initializing to (0,0)")
-                    item['x'] = 0.0
-                    item['y'] = 0.0
-                
-                # Convert to float to ensure proper JSON serialization
+            # Rebuild the export blob only when the nodes or central node
+            # change; plain reruns reuse the cached bytes. As for the canvas,
+            # the nodes are tracked by list identity and the ideas version
+            # rather than serialized on every rerun to detect a change
+            central_id = get_central()
+            export_key = (get_ideas_version(), len(ideas), central_id)
+            cached_export = st.session_state.get('_export_json')
+            if cached_export is not None and cached_export[0] is ideas and cached_export[1] == export_key:
+                json_data = cached_export[2]
+            else:
                 try:
-                    item['x'] = float(item['x'])
-                    item['y'] = float(item['y'])
-                except (ValueError, TypeError):
-                    logger.warning(f"Invalid position values in export for node {item.get('id')}, resetting to (0,0)")
-                    item['x'] = 0.0
-                    item['y'] = 0.0
-                
-                # Check for changes in value
-                if orig_x != item['x'] or orig_y != item['y']:
-                    logger.warning(f"Position values changed during export: Node {item.get('id')} from ({orig_x}, {orig_y}) to ({item['x']}, {item['y']})")
-                
-                # Track position info for logging
-                position_info.append(f"Node {item.get('id')} ({item.get('label')}): ({item['x']}, {item['y']})")
-            
-            # Log the position data for debugging
-            logger.info(f"Exporting {len(export)} nodes with positions:")
-            for pos in position_info:
-                logger.info(f"  {pos}")
-                
-            # Create filename with timestamp
-            export_filename = f"mindmap_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            
-            try:
-                # Create JSON data
-                json_data = json.dumps(export, indent=2)
-                
+                    json_data = _build_export_bytes(ideas, central_id)
+                    st.session_state['_export_json'] = (ideas, export_key, json_data)
+                except Exception as e:
+                    json_data = None
+                    logger.error(f"Error preparing JSON export: {str(e)}")
+                    st.error(f"Error exporting JSON: {str(e)}")
+
+            if json_data is not None:
+                # Create filename with timestamp
+                export_filename = f"mindmap_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                export_count = len(ideas)
                 st.download_button(
                     "💾 Export JSON",
                     data=json_data,
                     file_name=export_filename,
                     mime="application/json",
                     key="export_json_button",
-                    on_click=lambda: logger.info(f"Exported {len(export)} nodes to {export_filename}")
+                    on_click=lambda: logger.info(f"Exported {export_count} nodes to {export_filename}")
                 )
-            except Exception as e:
-                logger.error(f"Error preparing JSON export: {str(e)}")
-                st.error(f"Error exporting JSON: {str(e)}")
 
     # Add Bubble Form
     with st.sidebar.form("add_bubble_form"):
@@ -660,23 +1149,24 @@ try:
         label = st.text_input("Label")
         description = st.text_area("Description (optional)", height=100)
         col1, col2 = st.columns(2)
-        urgency = col1.selectbox("Urgency", list(get_theme()['urgency_colors'].keys()))
+        urgency_options, _, edge_type_options, _ = theme_options(get_current_theme())
+        urgency = col1.selectbox("Urgency", urgency_options)
         
         # Get all tags, including custom ones
         settings = get_store().get('settings', {})
         custom_tags = settings.get('custom_tags', [])
-        all_available_tags = [''] + list(TAGS.keys()) + custom_tags
+        all_available_tags = TAG_OPTIONS + tuple(custom_tags)
         
         # Display the tags dropdown
         tag = col2.selectbox("Tag", all_available_tags)
         
         parent_label = st.text_input("Parent label (blank → current center)")
-        edge_type = st.selectbox("Connection Type", list(get_theme()['edge_colors'].keys()))
+        edge_type = st.selectbox("Connection Type", edge_type_options)
 
         if st.form_submit_button("Add") and label:
             pid = None
             if parent_label.strip():
-                pid = next((i['id'] for i in get_ideas() if i['label'].strip() == parent_label.strip()), None)
+                pid = get_label_index().get(parent_label.strip())
                 if pid is None:
                     st.warning("Parent not found; adding as top-level")
             elif get_central() is not None:
@@ -743,28 +1233,33 @@ try:
                 st.success(f"Created new log file: {new_log}")
                 st.rerun()
             
+            # The log is read once per rerun for both the view and the
+            # download; it grows all the time, so it isn't cached
+            current_log_path = os.path.join(logs_dir, current_log)
+            try:
+                current_log_content = _read_log_file(current_log_path)
+                current_log_error = None
+            except Exception as e:
+                current_log_content, current_log_error = None, e
+            
             # Option to view the current log
             if st.button("View Current Log"):
-                try:
-                    with open(os.path.join(logs_dir, current_log), 'r') as f:
-                        log_content = f.read()
-                    st.text_area("Log Content", log_content, height=300)
-                except Exception as e:
-                    st.error(f"Error reading log file: {str(e)}")
+                if current_log_error is None:
+                    st.text_area("Log Content", current_log_content, height=300)
+                else:
+                    st.error(f"Error reading log file: {str(current_log_error)}")
             
             # Download current log
-            try:
-                with open(os.path.join(logs_dir, current_log), 'r') as f:
-                    log_content = f.read()
-                    st.download_button(
-                        "💾 Download Current Log",
-                        log_content,
-                        file_name=current_log,
-                        mime="text/plain",
-                        key="download_current_log"
-                    )
-            except Exception as e:
-                st.error(f"Error preparing log for download: {str(e)}")
+            if current_log_error is None:
+                st.download_button(
+                    "💾 Download Current Log",
+                    current_log_content,
+                    file_name=current_log,
+                    mime="text/plain",
+                    key="download_current_log"
+                )
+            else:
+                st.error(f"Error preparing log for download: {str(current_log_error)}")
             
             # Previous logs dropdown
             if len(log_files) > 1:
@@ -776,59 +1271,53 @@ try:
                 )
                 
                 if selected_log:
+                    # Previous logs no longer change, so they are read once
+                    selected_log_path = os.path.join(logs_dir, selected_log)
+                    try:
+                        selected_log_content = _read_previous_log(selected_log_path)
+                        selected_log_error = None
+                    except Exception as e:
+                        selected_log_content, selected_log_error = None, e
+                    
                     # View selected log
                     if st.button("View Selected Log"):
-                        try:
-                            with open(os.path.join(logs_dir, selected_log), 'r') as f:
-                                log_content = f.read()
-                            st.text_area("Previous Log Content", log_content, height=300)
-                        except Exception as e:
-                            st.error(f"Error reading selected log: {str(e)}")
+                        if selected_log_error is None:
+                            st.text_area("Previous Log Content", selected_log_content, height=300)
+                        else:
+                            st.error(f"Error reading selected log: {str(selected_log_error)}")
                     
                     # Download selected log
-                    try:
-                        with open(os.path.join(logs_dir, selected_log), 'r') as f:
-                            log_content = f.read()
-                            st.download_button(
-                                "💾 Download Selected Log",
-                                log_content,
-                                file_name=selected_log,
-                                mime="text/plain",
-                                key="download_selected_log"
-                            )
-                    except Exception as e:
-                        st.error(f"Error preparing selected log for download: {str(e)}")
+                    if selected_log_error is None:
+                        st.download_button(
+                            "💾 Download Selected Log",
+                            selected_log_content,
+                            file_name=selected_log,
+                            mime="text/plain",
+                            key="download_selected_log"
+                        )
+                    else:
+                        st.error(f"Error preparing selected log for download: {str(selected_log_error)}")
         else:
             st.info("No log files found.")
 
     # Edit / Center List
     ideas = get_ideas()
+    
+    # ID and label lookups for the list buttons and the edit modal
+    node_by_id, node_id_by_label = get_node_index(), get_label_index()
     if ideas:
-        # Add custom CSS for better button alignment
-        st.markdown("""
-        <style>
-        div[data-testid="column"] > div > div > div > div > div[data-testid="stButton"] > button {
-            width: 100%;
-            padding: 0px 5px;
-            display: flex;
-            justify-content: center;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-        
         with st.sidebar.expander("✏️ Node List"):
             # Add search bar inside Node List
-            node_search = st.text_input("🔍 Filter nodes", key="node_list_search")
+            # A new filter starts again from the first page
+            node_search = st.text_input("🔍 Filter nodes", key="node_list_search",
+                                        on_change=lambda: st.session_state.pop('node_list_pages', None))
             
             # Filter nodes based on search
             filtered_ideas = ideas
             if node_search:
-                filtered_ideas = [
-                    node for node in ideas 
-                    if node_search.lower() in node.get('label', 'Untitled Node').lower() or 
-                    (node.get('description') and node_search.lower() in node['description'].lower()) or
-                    (node.get('tag') and node_search.lower() in node['tag'].lower())
-                ]
+                # The lowercased search strings are cached until the ideas change
+                query = node_search.lower()
+                filtered_ideas = [node for node, haystack in zip(ideas, get_search_index()) if query in haystack]
                 
                 if not filtered_ideas:
                     st.info(f"No nodes match '{node_search}'")
@@ -837,8 +1326,10 @@ try:
             if node_search and filtered_ideas:
                 st.caption(f"Showing {len(filtered_ideas)} of {len(ideas)} nodes")
             
-            # List the filtered nodes
-            for node in filtered_ideas:
+            # List the filtered nodes a page at a time: every listed node
+            # costs a row of columns and three buttons on each rerun
+            shown_count = st.session_state.get('node_list_pages', 1) * NODE_LIST_PAGE_SIZE
+            for node in filtered_ideas[:shown_count]:
                 # Skip any malformed nodes without an ID
                 if 'id' not in node:
                     continue
@@ -862,21 +1353,26 @@ try:
                 if col4.button("🗑️", key=f"delete_{node['id']}", help="Delete this node",
                               on_click=lambda id=node['id']: st.session_state.update({'delete_node': id})):
                     pass
+            
+            if len(filtered_ideas) > shown_count:
+                st.button(f"Load more ({len(filtered_ideas) - shown_count} remaining)", key="node_list_more",
+                          on_click=lambda: st.session_state.update(
+                              {'node_list_pages': st.session_state.get('node_list_pages', 1) + 1}))
 
     # Handle button actions from session state
     if 'center_node' in st.session_state:
         node_id = st.session_state.pop('center_node')
-        if node_id in {n['id'] for n in ideas if 'id' in n}:
+        if node_id in node_by_id:
             set_central(node_id)
             st.rerun()
 
     if 'delete_node' in st.session_state:
         node_id = st.session_state.pop('delete_node')
-        if node_id in {n['id'] for n in ideas if 'id' in n}:
+        if node_id in node_by_id:
             save_state_to_history()
             
-            # Use the utility function to collect descendants
-            to_remove = collect_descendants(node_id, ideas)
+            # Walk the subtree with the cached parent -> children index
+            to_remove = collect_descendants(node_id, ideas, children_index=get_children_index())
 
             set_ideas([n for n in ideas if 'id' not in n or n['id'] not in to_remove])
             if get_central() in to_remove:
@@ -888,7 +1384,7 @@ try:
     # Node Edit Modal
     if 'edit_node' in st.session_state and st.session_state['edit_node'] is not None:
         node_id = st.session_state['edit_node']
-        node = find_node_by_id(ideas, node_id)
+        node = find_node_by_id(ideas, node_id, node_index=node_by_id)
 
         if node:
             with st.form(key=f"edit_node_{node_id}"):
@@ -896,40 +1392,33 @@ try:
                 new_label = st.text_input("Label", value=node.get('label', 'Untitled Node'))
                 new_description = st.text_area("Description", value=node.get('description', ''), height=150)
                 col1, col2 = st.columns(2)
+                urgency_options, urgency_index, edge_type_options, edge_type_index = theme_options(get_current_theme())
                 new_urgency = col1.selectbox("Urgency",
-                                            list(get_theme()['urgency_colors'].keys()),
-                                            index=list(get_theme()['urgency_colors'].keys()).index(node.get('urgency', 'low')))
+                                            urgency_options,
+                                            index=urgency_index.get(node.get('urgency', 'low'), 0))
                 
                 # Get all tags, including custom ones
                 settings = get_store().get('settings', {})
                 custom_tags = settings.get('custom_tags', [])
-                all_available_tags = [''] + list(TAGS.keys()) + custom_tags
-                
-                # Find the index of the current tag or default to empty
-                current_tag = node.get('tag', '')
-                tag_index = 0
-                if current_tag in all_available_tags:
-                    tag_index = all_available_tags.index(current_tag)
                 
+                # Select the current tag or default to empty
                 new_tag = col2.selectbox("Tag",
-                                        all_available_tags,
-                                        index=tag_index)
+                                        TAG_OPTIONS + tuple(custom_tags),
+                                        index=tag_option_index(node.get('tag', ''), custom_tags))
 
                 if node['parent'] is not None:
-                    parent_node = find_node_by_id(ideas, node['parent'])
+                    parent_node = find_node_by_id(ideas, node['parent'], node_index=node_by_id)
                     if parent_node:
                         current_parent = parent_node.get('label', 'Untitled Node')
                     else:
                         current_parent = ""
                     new_parent = st.text_input("Parent label (blank → no parent)", value=current_parent)
                     new_edge_type = st.selectbox("Connection Type",
-                                                list(get_theme()['edge_colors'].keys()),
-                                                index=list(get_theme()['edge_colors'].keys()).index(node.get('edge_type', 'default')) 
-                                                    if node.get('edge_type', 'default') in get_theme()['edge_colors'] 
-                                                    else 0)
+                                                edge_type_options,
+                                                index=edge_type_index.get(node.get('edge_type', 'default'), 0))
                 else:
                     new_parent = st.text_input("Parent label (blank → no parent)")
-                    new_edge_type = st.selectbox("Connection Type", list(get_theme()['edge_colors'].keys()))
+                    new_edge_type = st.selectbox("Connection Type", edge_type_options)
 
                 # Form buttons - ensure we have submit buttons
                 col1, col2 = st.columns(2)
@@ -943,13 +1432,13 @@ try:
                     node['description'] = new_description
                     node['urgency'] = new_urgency
                     node['tag'] = new_tag
-                    recalc_size(node)
+                    recalc_size(node, force=True)
 
                     # Update parent if needed
                     if new_parent.strip():
-                        new_pid = next((i['id'] for i in get_ideas() if i['label'].strip() == new_parent.strip()), None)
+                        new_pid = node_id_by_label.get(new_parent.strip())
                         if new_pid is not None and new_pid != node['id']:  # Prevent self-reference
-                            if not is_circular(node['id'], new_pid, ideas):
+                            if not is_circular(node['id'], new_pid, ideas, node_index=node_by_id):
                                 node['parent'] = new_pid
                                 node['edge_type'] = new_edge_type
                             else:
@@ -960,6 +1449,8 @@ try:
                         node['parent'] = None
                         node['edge_type'] = 'default'
 
+                    # set_ideas marks the ideas changed for the derived indexes
+                    set_ideas(ideas)
                     save_data(get_store())
                     st.session_state['edit_node'] = None
                     st.rerun()
@@ -1008,610 +1499,59 @@ try:
     # Set canvas height based on expansion state
     canvas_height = CANVAS_DIMENSIONS['expanded' if canvas_expanded else 'normal']
 
-    # Build PyVis Network
-    theme = get_theme()
-    canvas_height = CANVAS_DIMENSIONS['expanded' if st.session_state.get('canvas_expanded', False) else 'normal']
-    
-    # Create network with transparent background for seamless integration
-    net = Network(
-        height=canvas_height, 
-        width="100%", 
-        directed=True, 
-        bgcolor=theme['background'],
-        font_color=theme.get('text_color', '#333333'),
-        select_menu=False,  # Remove the default right-click menu
-        filter_menu=False,  # Remove the filter menu
-        cdn_resources='local'  # Use local resources for better loading
-    )
-
-    # Configure physics using centralized settings
-    net.barnes_hut(
-        gravity=NETWORK_CONFIG['gravity'],
-        central_gravity=NETWORK_CONFIG['central_gravity'],
-        spring_length=NETWORK_CONFIG['spring_length'],
-        spring_strength=spring_strength,
-        damping=NETWORK_CONFIG['damping'],
-        overlap=NETWORK_CONFIG['overlap']
-    )
-
-    # Add nodes and edges to the network
-    id_set = {n['id'] for n in ideas if 'id' in n}
-    
-    # Get central node
+    # Build the canvas HTML (the PyVis network plus our scripts and the node
+    # positions), reusing the last build while nothing it depends on (nodes,
+    # settings, theme, central node, layout) has changed. The nodes are
+    # tracked like the other per-ideas caches, by list identity and the ideas
+    # version, so a rerun that leaves them alone doesn't serialize them; only
+    # the small remaining inputs are hashed
     central_id = get_central()
-    logger.info(f"Creating nodes with central node ID: {central_id}")
-    
-    for n in ideas:
-        # Skip nodes without an id
-        if 'id' not in n:
-            continue
-            
-        recalc_size(n)
-
-        # Get the color mode from settings
-        color_mode = get_store().get('settings', {}).get('color_mode', 'urgency')
-        
-        # Log node and coloring details
-        node_id = n.get('id')
-        node_tag = n.get('tag', '')
-        node_urgency = n.get('urgency', 'medium')
-        logger.debug(f"Coloring node {node_id} with tag='{node_tag}', urgency='{node_urgency}', mode='{color_mode}'")
-        
-        # Set color based on tag or urgency depending on color mode
-        if color_mode == 'tag' and n.get('tag'):
-            # Use tag color if available
-            color_hex = get_tag_color(n['tag'])
-            logger.debug(f"Node {node_id}: Using tag color {color_hex} for tag '{n['tag']}'")
-        else:
-            # Fall back to urgency color
-            color_hex = get_urgency_color(n.get('urgency', 'medium'))
-            logger.debug(f"Node {node_id}: Using urgency color {color_hex} for '{n.get('urgency', 'medium')}'")
-
-        r, g, b = hex_to_rgb(color_hex)
-        bg, bd = f"rgba({r},{g},{b},{RGBA_ALPHA})", f"rgba({r},{g},{b},1)"
-
-        # Apply the size multiplier to make urgency differences more noticeable
-        base_size = n.get('size', 20)  # Default size of 20 if not set
-        if n.get('urgency') == 'high':
-            base_size = base_size * size_multiplier
-        elif n.get('urgency') == 'low':
-            base_size = base_size / size_multiplier
-            
-        size_px = base_size * (1.5 if n['id'] == central_id else 1)
-        
-        # Apply special highlighting for central node
-        is_central = n['id'] == central_id
-        if is_central:
-            bd = "#FF5722"  # Bright orange border
-            border_width = 3  # Thicker border
-            logger.info(f"Applying special highlighting to central node {n['id']}")
-        else:
-            border_width = 1
-
-        # Prepare node title with description for hover text
-        title = n['label']
-        if n.get('tag'):
-            title = f"[{n['tag']}] {title}"
-        if n.get('description'):
-            title += f"\n\n{n['description']}"
-
-        kwargs = {
-            'label': n['label'],
-            'title': title,
-            'size': size_px,
-            'color': {'background': bg, 'border': bd},
-            'borderWidth': border_width,
-            'shape': 'circle',
-            'fixed': {'x': False, 'y': False}
-        }
-
-        if n['x'] is not None and n['y'] is not None:
-            kwargs.update(x=n['x'], y=n['y'])
-
-        net.add_node(n['id'], **kwargs)
-
-    # Add edges between nodes
-    for n in ideas:
-        # Skip nodes without an id
-        if 'id' not in n:
-            continue
-            
-        pid = n.get('parent')
-        if pid in id_set:
-            edge_type = n.get('edge_type', 'default')
-            # Make sure the edge type is valid for the current theme
-            if edge_type not in get_theme()['edge_colors']:
-                edge_type = 'default'  # Fallback to default if not in theme
-            edge_color = get_edge_color(edge_type)
-            net.add_edge(pid, n['id'], arrows='to', color=edge_color, title=edge_type, length=edge_length)
-
-    # Generate PyVis HTML with modified network code to ensure accessibility
-    html_content = net.generate_html()
-
-    # Create simplified HTML with direct network object access
-    modified_html = html_content.replace(
-        'var network = new vis.Network(',
-        'window.visNetwork = new vis.Network('
-    )
-    
-    # Add additional hook to ensure network is accessible globally
-    modified_html = modified_html.replace(
-        '</script>',
-        '''
-        // Add hook to ensure visNetwork is available
-        if (typeof network !== 'undefined' && !window.visNetwork) {
-            console.log('Setting window.visNetwork from local network variable');
-            window.visNetwork = network;
-        }
-        
-        // Debug that will run after network creation
-        setTimeout(function() {
-            console.log('Network object availability check:');
-            console.log('- window.visNetwork available:', window.visNetwork !== undefined);
-            if (!window.visNetwork) {
-                console.log('Searching for network in canvases...');
-                var networkDiv = document.getElementById('mynetwork');
-                if (networkDiv) {
-                    var canvases = networkDiv.querySelectorAll('canvas');
-                    for (var i = 0; i < canvases.length; i++) {
-                        if (canvases[i].network) {
-                            console.log('Found network in canvas, setting as window.visNetwork');
-                            window.visNetwork = canvases[i].network;
-                            break;
-                        }
-                    }
-                }
-            }
-        }, 1000);
-        </script>'''
-    )
-
-    # Add direct event listeners to guarantee they are attached
-    direct_js = """
-    <script>
-    // Create a hidden form for direct form submissions
-    var hiddenForm = document.createElement('form');
-    hiddenForm.id = 'hidden-message-form';
-    hiddenForm.method = 'GET';
-    hiddenForm.target = '_top'; // Target the top window
-    hiddenForm.style.display = 'none';
-
-    // Add input fields
-    var actionInput = document.createElement('input');
-    actionInput.type = 'hidden';
-    actionInput.id = 'hidden-action-input';
-    actionInput.name = 'action';
-
-    var payloadInput = document.createElement('input');
-    payloadInput.type = 'hidden';
-    payloadInput.id = 'hidden-payload-input';
-    payloadInput.name = 'payload';
-
-    // Add submit button
-    var submitButton = document.createElement('button');
-    submitButton.type = 'submit';
-    submitButton.id = 'hidden-submit-button';
-    submitButton.style.display = 'none';
-
-    // Assemble the form
-    hiddenForm.appendChild(actionInput);
-    hiddenForm.appendChild(payloadInput);
-    hiddenForm.appendChild(submitButton);
-
-    // Add form to document
-    document.body.appendChild(hiddenForm);
-    
-    // Store node positions from the server
-    window.serverNodePositions = {}; 
-    
-    // Function to explicitly ensure positions from server data are applied to nodes
-    function ensureNodePositionsApplied() {
-        if (window.visNetwork && window.serverNodePositions) {
-            console.log('🔧 Explicitly applying stored positions to network');
-            
-            try {
-                if (typeof applyStoredPositions === 'function') {
-                    // Use the dedicated function if available
-                    applyStoredPositions(window.visNetwork, window.serverNodePositions);
-                } else {
-                    // Manual fallback
-                    console.log('📝 Using manual position application');
-                    const nodeIds = Object.keys(window.serverNodePositions);
-                    console.log(`Applying positions to ${nodeIds.length} nodes`);
-                    
-                    let appliedCount = 0;
-                    nodeIds.forEach(nodeId => {
-                        const pos = window.serverNodePositions[nodeId];
-                        if (pos && pos.x !== undefined && pos.y !== undefined) {
-                            try {
-                                const x = parseFloat(pos.x);
-                                const y = parseFloat(pos.y);
-                                
-                                if (!isNaN(x) && !isNaN(y)) {
-                                    window.visNetwork.moveNode(nodeId, x, y);
-                                    appliedCount++;
-                                }
-                            } catch (e) {
-                                console.error(`Error applying position to node ${nodeId}:`, e);
-                            }
-                        }
-                    });
-                    
-                    console.log(`Manually applied ${appliedCount} node positions`);
-                }
-                
-                // Force network to redraw
-                if (window.visNetwork.redraw) {
-                    window.visNetwork.redraw();
-                }
-                
-                console.log('✅ Node positions applied successfully');
-                return true;
-            } catch (error) {
-                console.error('❌ Error applying node positions:', error);
-                return false;
-            }
-        } else {
-            console.warn('⚠️ Cannot apply positions: network or positions not available');
-            return false;
-        }
-    }
-
-    // Attach drag end event handler to the vis.js network
-    function setupDragEndHandler() {
-        if (window.visNetwork) {
-            console.log('Adding dragEnd event listener to visNetwork');
-            
-            // Add the dragEnd event to track node position changes
-            window.visNetwork.on('dragEnd', function(params) {
-                if (params.nodes && params.nodes.length > 0) {
-                    const nodeId = params.nodes[0];
-                    const nodePosition = window.visNetwork.getPositions([nodeId])[nodeId];
-                    
-                    console.log('Node dragged:', nodeId, 'to position:', nodePosition);
-                    
-                    // Update stored positions
-                    if (!window.serverNodePositions) window.serverNodePositions = {};
-                    window.serverNodePositions[nodeId] = { 
-                        x: nodePosition.x, 
-                        y: nodePosition.y 
-                    };
-                    
-                    // Add more detailed logging
-                    console.log('Sending position update with payload:', {
-                        id: nodeId,
-                        x: nodePosition.x,
-                        y: nodePosition.y
-                    });
-                    
-                    // Send position update to backend
-                    simpleSendMessage('pos', {
-                        id: nodeId,
-                        x: nodePosition.x,
-                        y: nodePosition.y
-                    });
-                }
-            });
-            
-            console.log('dragEnd event handler attached successfully');
-            return true;
-        } else {
-            console.error('visNetwork not available when trying to attach dragEnd handler');
-            return false;
-        }
-    }
-
-    // Try to set up the handler with retry logic
-    var dragEndSetupAttempts = 0;
-    var maxDragEndSetupAttempts = 20; // More attempts with longer total wait time
-    
-    function attemptDragEndSetup() {
-        dragEndSetupAttempts++;
-        console.log(`Attempt ${dragEndSetupAttempts}/${maxDragEndSetupAttempts} to set up dragEnd handler`);
-        
-        if (setupDragEndHandler()) {
-            console.log('Successfully set up dragEnd handler');
-        } else if (dragEndSetupAttempts < maxDragEndSetupAttempts) {
-            // Try again after a delay, with increasing wait time
-            var delay = 300 + (dragEndSetupAttempts * 100); // Gradually increase delay
-            console.log(`Will retry in ${delay}ms...`);
-            setTimeout(attemptDragEndSetup, delay);
-        } else {
-            console.error('Failed to set up dragEnd handler after maximum attempts');
-        }
-    }
-    
-    // Start trying to set up the handler
-    document.addEventListener('DOMContentLoaded', function() {
-        // Initial delay to give network time to initialize
-        setTimeout(attemptDragEndSetup, 1000);
-        
-        // Also watch for the network object to become available
-        var networkWatcher = setInterval(function() {
-            if (window.visNetwork) {
-                clearInterval(networkWatcher);
-                console.log('Network detected by watcher, attempting to attach dragEnd handler');
-                setupDragEndHandler();
-            }
-        }, 300);
-    });
-
-    // Also add mutation observer to detect when network is added to DOM
-    var networkObserver = new MutationObserver(function(mutations) {
-        mutations.forEach(function(mutation) {
-            if (mutation.addedNodes && mutation.addedNodes.length > 0) {
-                for (var i = 0; i < mutation.addedNodes.length; i++) {
-                    var node = mutation.addedNodes[i];
-                    // Check if the added node is the network container or contains it
-                    if (node.id === 'mynetwork' || (node.querySelector && node.querySelector('#mynetwork'))) {
-                        console.log('Network container detected in DOM via MutationObserver');
-                        // Check if we can access the network
-                        setTimeout(function() {
-                            // Try to detect network after the container is added
-                            if (window.visNetwork) {
-                                console.log('Network object available after container detection');
-                                setupDragEndHandler();
-                            } else {
-                                // Try to find the network object in other ways
-                                var networkDiv = document.getElementById('mynetwork');
-                                if (networkDiv) {
-                                    console.log('Found network div, looking for network object');
-                                    var canvases = networkDiv.querySelectorAll('canvas');
-                                    if (canvases.length > 0) {
-                                        for (var j = 0; j < canvases.length; j++) {
-                                            if (canvases[j].network) {
-                                                console.log('Found network object in canvas');
-                                                window.visNetwork = canvases[j].network;
-                                                setupDragEndHandler();
-                                                break;
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        }, 500);
-                    }
-                }
-            }
-        });
-    });
-    
-    // Start observing document body for changes
-    networkObserver.observe(document.body, {
-        childList: true,
-        subtree: true
-    });
-
-    // Create global helper for direct parent-frame communication using pure postMessage
-    window.directParentCommunication = {
-        sendMessage: function(action, payload) {
-            try {
-                console.log('POSTMESSAGE: Sending message to parent: ' + action);
-                
-                // Create the message object
-                var message = {
-                    source: 'network_canvas',
-                    action: action,
-                    payload: payload,
-                    timestamp: Date.now()
-                };
-                
-                // Send to parent directly - this works even in sandboxed iframes
-                window.parent.postMessage(message, '*');
-                console.log('POSTMESSAGE: Message sent to parent');
-                return true;
-            } catch(e) {
-                console.error('POSTMESSAGE: Communication failed: ' + e.message);
-                return false;
-            }
-        }
-    };
-
-    // Communication helper for sending messages to Streamlit
-    function simpleSendMessage(action, payload) {
-        try {
-            // Package the message with source identifier
-            var message = {
-                source: 'network_canvas',
-                action: action,
-                payload: payload,
-                timestamp: Date.now()
-            };
-            
-            // Track if any communication method succeeds
-            var communicationSucceeded = false;
-            
-            // Try direct parent communication first (most reliable)
-            try {
-                const directResult = window.directParentCommunication.sendMessage(action, payload);
-                if (directResult) {
-                    communicationSucceeded = true;
-                    return; // Exit early if successful
-                }
-            } catch(e) {
-                console.error('Direct parent communication failed: ' + e.message);
-            }
-            
-            // Method 1: Send via postMessage (main method)
-            try {
-                // Try multiple targets (sometimes frames can be nested)
-                const targets = [window.parent, window.top, window];
-                
-                for (let i = 0; i < targets.length; i++) {
-                    try {
-                        const target = targets[i];
-                        if (target && target !== window) {
-                            target.postMessage(message, '*');
-                            communicationSucceeded = true;
-                            break;
-                        }
-                    } catch (e) {
-                        console.error(`Failed to send to target ${i}: ${e.message}`);
-                    }
-                }
-                
-                if (!communicationSucceeded) {
-                    // Try standard window.parent as last resort
-                    window.parent.postMessage(message, '*');
-                    communicationSucceeded = true;
-                }
-            } catch(e) {
-                console.error('All postMessage attempts failed: ' + e.message);
-            }
-            
-            // Method 2: Direct URL parameter modification if postMessage failed
-            if (!communicationSucceeded) {
-                try {
-                    var params = new URLSearchParams(window.location.search);
-                    params.set('action', action);
-                    
-                    // Make sure to preserve all payload fields for coordinate calculations
-                    if (payload) {
-                        // Include canvas dimensions with click coordinates
-                        if (payload.x !== undefined && payload.y !== undefined) {
-                            var networkDiv = document.getElementById('mynetwork');
-                            if (networkDiv) {
-                                var rect = networkDiv.getBoundingClientRect();
-                                payload.canvasWidth = rect.width;
-                                payload.canvasHeight = rect.height;
-                            }
-                        }
-                    }
-                    
-                    params.set('payload', JSON.stringify(payload));
-                    var newUrl = window.top.location.pathname + '?' + params.toString();
-                    window.top.location.href = newUrl;
-                    communicationSucceeded = true;
-                    return; // Success, so return early
-                } catch(e) {
-                    console.error('URL parameter method failed: ' + e.message);
-                }
-            }
-            
-            // Method 3: Try localStorage if available and previous methods failed
-            if (!communicationSucceeded && window.localStorage) {
-                try {
-                    localStorage.setItem('mindmap_message', JSON.stringify(message));
-                    localStorage.setItem('mindmap_trigger_reload', Date.now().toString());
-                    communicationSucceeded = true;
-                } catch(e) {
-                    console.error('localStorage method failed: ' + e.message);
-                }
-            }
-            
-            // Method 4: Form submission as last resort
-            if (!communicationSucceeded) {
-                try {
-                    var form = document.getElementById('hidden-message-form');
-                    var actionInput = document.getElementById('hidden-action-input');
-                    var payloadInput = document.getElementById('hidden-payload-input');
-                    
-                    if (form && actionInput && payloadInput) {
-                        actionInput.value = action;
-                        payloadInput.value = JSON.stringify(payload);
-                        form.submit();
-                        communicationSucceeded = true;
-                    }
-                } catch(e) {
-                    console.error('Form submission method failed: ' + e.message);
-                }
-            }
-        } catch(e) {
-            console.error('CRITICAL ERROR in simpleSendMessage: ' + e.message);
-        }
-    }
-
-    // Add a simplified click handler
-    document.addEventListener('DOMContentLoaded', function() {
-        // Find the canvas container
-        var networkDiv = document.getElementById('mynetwork');
-        if (!networkDiv) {
-            console.error('ERROR: mynetwork div not found');
-            return;
-        }
-        
-        // Add the global click handler
-        networkDiv.addEventListener('click', function(event) {
-            // Get coordinates relative to the container
-            var rect = networkDiv.getBoundingClientRect();
-            var relX = event.clientX - rect.left;
-            var relY = event.clientY - rect.top;
-            
-            // Send the click event with coordinates
-            simpleSendMessage('canvas_click', {
-                x: relX,
-                y: relY,
-                canvasWidth: rect.width,
-                canvasHeight: rect.height,
-                timestamp: new Date().getTime()
-            });
-        });
+    network_key = (get_ideas_version(), len(ideas), hashlib.blake2b(json_utils.dumps_bytes([
+        get_store().get('settings', {}), get_current_theme(), central_id,
+        canvas_height, spring_strength, edge_length, size_multiplier
+    ]), digest_size=16).digest())
+    cached_network = st.session_state.get('_network_html')
+    if cached_network is not None and cached_network[0] is ideas and cached_network[1] == network_key:
+        modified_html = cached_network[2]
+    else:
+        modified_html = _build_network_html(
+            ideas, central_id, canvas_height, spring_strength, edge_length, size_multiplier)
         
-        // Add double-click handler for editing
-        networkDiv.addEventListener('dblclick', function(event) {
-            // Get coordinates relative to the container
-            var rect = networkDiv.getBoundingClientRect();
-            var relX = event.clientX - rect.left;
-            var relY = event.clientY - rect.top;
-            
-            // Send the double-click event
-            simpleSendMessage('canvas_dblclick', {
-                x: relX,
-                y: relY,
-                canvasWidth: rect.width,
-                canvasHeight: rect.height,
-                timestamp: new Date().getTime()
-            });
-            
-            // Prevent default browser double-click behavior
-            event.preventDefault();
-        });
+        # Network positions for all nodes (skipping (0,0) defaults) as an id list
+        # plus packed float64 coordinates
+        position_ids_json, position_xy_b64 = get_encoded_node_positions()
         
-        // Add context menu handler for deleting
-        networkDiv.addEventListener('contextmenu', function(event) {
-            // Prevent default browser context menu
-            event.preventDefault();
-            
-            // Get coordinates relative to the container
-            var rect = networkDiv.getBoundingClientRect();
-            var relX = event.clientX - rect.left;
-            var relY = event.clientY - rect.top;
-            
-            // Confirm deletion
-            if (confirm('Delete this bubble?')) {
-                // Send the right-click event
-                simpleSendMessage('canvas_contextmenu', {
-                    x: relX,
-                    y: relY,
-                    canvasWidth: rect.width,
-                    canvasHeight: rect.height,
-                    timestamp: new Date().getTime()
-                });
-            }
-            
-            return false;
-        });
-    });
-    </script>
-    """
-
-    # Add the direct JS right before the closing </body> tag
-    modified_html = modified_html.replace('</body>', direct_js + '</body>')
-
-    # Render the modified HTML
+        # Add the direct JS (event listeners), the position data and the code that
+        # applies it right before the closing </body> tag, in one splice
+        modified_html = _insert_before_body_close(
+            modified_html, DIRECT_JS, server_positions_html(position_ids_json, position_xy_b64), POSITION_APPLY_JS)
+        st.session_state['_network_html'] = (ideas, network_key, modified_html)
+
+    # Render the modified HTML. This has to run on every rerun, even when the
+    # HTML is unchanged: Streamlit removes elements a rerun doesn't emit, so
+    # skipping it would drop the canvas. With identical arguments the
+    # frontend keeps the existing iframe instead of reloading it
     components.html(
         modified_html, 
-        height=int(canvas_height.replace("px", "")), 
+        height=px_to_int(canvas_height), 
         scrolling=False
     )
 
     # Process any messages from JavaScript
     action = st.query_params.get('action', None)
     payload_str = st.query_params.get('payload', None)
+    if action is not None or payload_str is not None:
+        # Consume the message so the rerun a handler triggers doesn't dispatch
+        # it again; from_dict rewrites the URL once rather than once per key
+        st.query_params.from_dict({
+            key: st.query_params.get_all(key)
+            for key in st.query_params if key not in ('action', 'payload')
+        })
     
     # Initialize message debug in session state if not present
+    # (bounded, so the oldest entries drop off automatically)
     if 'message_debug' not in st.session_state:
-        st.session_state.message_debug = []
+        st.session_state.message_debug = deque(maxlen=50)
     
     # Add current message to debug log immediately if present
     if action and payload_str:
@@ -1628,12 +1568,8 @@ try:
         # Add to the log
         st.session_state.message_debug.append(new_message)
         
-        # Limit log size
-        if len(st.session_state.message_debug) > 50:
-            st.session_state.message_debug = st.session_state.message_debug[-50:]
-        
         # Log to console/file
-        logger.info(f"Received message: action={action}, payload={payload_str}")
+        logger.info("Received message: action=%s, payload=%s", action, payload_str)
         
         # Add a prominent notification banner
         st.success(f"🔔 Message received: **{action}** at {current_time}")
@@ -1644,169 +1580,41 @@ try:
     # Remove the two buttons
 
     if action:
+        # Read the ideas once for the whole handler; rebound after mutations
+        ideas = get_ideas()
         try:
-            # Parse the payload
+            # Parse the payload, rejecting anything that isn't a JSON object
+            # or array before it reaches the parser
             if payload_str:
-                payload = json.loads(payload_str)
+                if payload_str.lstrip()[:1] not in ('{', '['):
+                    raise ValueError(f"Payload is not a JSON object or array: {payload_str[:50]}")
+                payload = json_utils.loads(payload_str)
                 
                 # Log successful payload parsing
-                logger.debug(f"Payload parsed successfully: {payload}")
+                logger.debug("Payload parsed successfully: %s", payload)
                 
-                # Handle different action types
-                if action.startswith('canvas_'):
-                    # Handle canvas coordinate-based messages
-                    logger.info(f"Processing canvas interaction: {action}")
-                    
-                    # For click/dblclick actions, find the nearest node
-                    if action in ['canvas_click', 'canvas_dblclick', 'canvas_contextmenu']:
-                        if 'x' in payload and 'y' in payload:
-                            # Process the coordinates
-                            click_x = payload.get('x', 0)
-                            click_y = payload.get('y', 0)
-                            canvas_width = payload.get('canvasWidth', 800)
-                            canvas_height = payload.get('canvasHeight', 600)
-                            
-                            # Store the coordinates in session state
-                            st.session_state.last_click_coords = {
-                                'x': click_x,
-                                'y': click_y,
-                                'canvasWidth': canvas_width,
-                                'canvasHeight': canvas_height,
-                                'timestamp': payload.get('timestamp', datetime.datetime.now().timestamp() * 1000)
-                            }
-                            
-                            logger.info(f"Canvas {action} at coordinates: ({click_x}, {click_y})")
-                            
-                            # Get all nodes with stored positions
-                            ideas = get_ideas()
-                            nodes_with_pos = [n for n in ideas if n.get('x') is not None and n.get('y') is not None]
-                            
-                            # Debug logging
-                            logger.info(f"Total nodes: {len(ideas)}, Nodes with positions: {len(nodes_with_pos)}")
-                            
-                            canvas_action_successful = False
-                            
-                            if nodes_with_pos:
-                                # Use utility function to find the closest node
-                                closest_node, min_distance, click_threshold = find_closest_node(
-                                    nodes_with_pos, click_x, click_y, canvas_width, canvas_height
-                                )
-                                
-                                if closest_node:
-                                    logger.info(f"Closest node: {closest_node['id']} ({closest_node.get('label', 'Untitled Node')}) at distance {min_distance:.2f}, threshold: {click_threshold:.2f}")
-                                
-                                if closest_node and min_distance < click_threshold:
-                                    node_id = closest_node['id']
-                                    logger.info(f"Node {node_id} is within threshold - processing {action}")
-                                    
-                                    # Handle different actions
-                                    if action == 'canvas_click':
-                                        # Regular click - select and center the node
-                                        st.session_state.selected_node = node_id
-                                        st.session_state.show_node_details = True
-                                        set_central(node_id)
-                                        save_data(get_store())
-                                        logger.info(f"Selected and centered node {node_id}")
-                                        canvas_action_successful = True
-                                    
-                                    elif action == 'canvas_dblclick':
-                                        # Double-click - edit the node
-                                        st.session_state['edit_node'] = node_id
-                                        logger.info(f"Opening edit modal for node {node_id}")
-                                        canvas_action_successful = True
-                                    
-                                    elif action == 'canvas_contextmenu':
-                                        # Right-click - delete the node (and its descendants)
-                                        logger.info(f"Deleting node {node_id}")
-                                        
-                                        # Save state before deletion
-                                        save_state_to_history()
-                                        
-                                        # Remove node and its descendants using utility function
-                                        to_remove = collect_descendants(node_id, ideas)
-                                        
-                                        set_ideas([n for n in ideas if 'id' not in n or n['id'] not in to_remove])
-                                        
-                                        # Update central node if needed
-                                        if get_central() in to_remove:
-                                            new_central = next((n['id'] for n in ideas if 'id' not in n or n['id'] not in to_remove), None)
-                                            set_central(new_central)
-                                        
-                                        save_data(get_store())
-                                        logger.info(f"Deleted node {node_id} and {len(to_remove)-1} descendants")
-                                        canvas_action_successful = True
-                                else:
-                                    if closest_node:
-                                        logger.warning(f"No node found near click coordinates (closest: {closest_node.get('label', 'Untitled Node')} at distance: {min_distance:.2f}, threshold: {click_threshold:.2f})")
-                                    else:
-                                        logger.warning(f"No nodes found near click coordinates")
-                            
-                            # Show warning message if action failed
-                            if not canvas_action_successful and action != 'canvas_click':
-                                logger.error(f"Canvas action {action} failed at coordinates ({click_x:.1f}, {click_y:.1f})")
-                    
-                    # Store message info in session state to confirm processing 
-                    st.session_state.last_processed_message = {
-                        'action': action,
-                        'payload': payload,
-                        'time': current_time
-                    }
-                    
-                    # Force a rerun to update the UI after processing
-                    st.rerun()
-                    
-                elif action == 'pos':
-                    # Handle node position update
-                    logger.info(f"💥 POSITION UPDATE MESSAGE RECEIVED: {payload}")
-                    
-                    if 'id' in payload and 'x' in payload and 'y' in payload:
-                        node_id = payload['id']
-                        x = payload['x']
-                        y = payload['y']
-                        
-                        logger.info(f"⭐ POSITION DEBUG: Processing update for node {node_id} to ({x}, {y}) of types (x: {type(x).__name__}, y: {type(y).__name__})")
-                        
-                        # Use the centralized position update service
-                        try:
-                            from src.node_utils import update_node_position_service
-                            from src.history import save_state_to_history
-                            
-                            result = update_node_position_service(
-                                node_id=node_id, 
-                                x=x, 
-                                y=y, 
-                                get_ideas_func=get_ideas,
-                                set_ideas_func=set_ideas,
-                                save_state_func=save_state_to_history,
-                                save_data_func=save_data,
-                                get_store_func=get_store
-                            )
-                            
-                            if result['success']:
-                                logger.info(f"💾 POSITION UPDATE SUCCESS: {result['message']}")
-                                st.rerun()
-                            else:
-                                logger.warning(f"❌ POSITION UPDATE FAILED: {result['message']}")
-                        except Exception as e:
-                            logger.error(f"❌ Error updating position: {str(e)}")
-                            logger.error(traceback.format_exc())
-                    else:
-                        logger.error(f"❌ Invalid position update payload: {payload}")
+                # Dispatch to the handler for this action type
+                handler = _ACTION_HANDLERS.get(action)
+                if handler is None and action.startswith('canvas_'):
+                    handler = _handle_canvas_message
+                if handler is not None:
+                    handler(action, payload, ideas, current_time)
+                    ideas = get_ideas()
                 else:
                     # Handle other action types
-                    logger.info(f"Processing regular action: {action}")
+                    logger.info("Processing regular action: %s", action)
         except Exception as e:
-            logger.error(f"Error processing message: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.error(f"Error processing message: {str(e)}", exc_info=True)
 
     # Node details section for both central and selected nodes
     # Use only the central node approach
     display_node = None
+    store = get_store()
     
-    if get_central() is not None:
-        central_id = get_central()
+    central_id = store.get('central')
+    if central_id is not None:
         logger.info(f"Using central node ID: {central_id}")
-        display_node = find_node_by_id(ideas, central_id)
+        display_node = find_node_by_id(ideas, central_id, node_index=get_node_index())
         logger.info(f"Found node for central ID: {display_node is not None}")
     
     # Fallback: If no central node, pick the first node if available
@@ -1825,7 +1633,8 @@ try:
         logger.warning("No ideas/nodes found in the store")
     
     # Display color mode legend
-    color_mode = get_store().get('settings', {}).get('color_mode', 'urgency')
+    settings = store.get('settings', {})
+    color_mode = settings.get('color_mode', 'urgency')
     col1, col2 = st.columns([3, 1])
     with col1:
         if color_mode == 'urgency':
@@ -1835,35 +1644,41 @@ try:
     with col2:
         # Quick toggle button
         if st.button("Toggle Color Mode"):
-            settings = get_store().get('settings', {})
             new_mode = 'tag' if color_mode == 'urgency' else 'urgency'
             settings['color_mode'] = new_mode
             save_data(get_store())
             st.rerun()
 
     if display_node:
-        logger.info(f"Displaying node: {display_node['id']} - {display_node.get('label', 'Untitled Node')}")
+        display_id = display_node['id']
+        display_label = display_node.get('label', 'Untitled Node')
+        display_tag = display_node.get('tag')
+        display_description = display_node.get('description')
+        logger.info(f"Displaying node: {display_id} - {display_label}")
         # Display node with a clean style, matching the center button approach
-        st.subheader(f"📌 Selected: {display_node.get('label', 'Untitled Node')}")
+        st.subheader(f"📌 Selected: {display_label}")
 
         # Display node details
-        if display_node.get('tag'):
-            st.write(f"**Tag:** {display_node['tag']}")
+        if display_tag:
+            st.write(f"**Tag:** {display_tag}")
 
         st.write(f"**Urgency:** {display_node.get('urgency', 'medium')}")
 
-        if display_node.get('description'):
+        if display_description:
             st.markdown("**Description:**")
-            st.markdown(display_node['description'])
+            st.markdown(display_description)
         else:
             st.markdown("**Description:** *No description available*")
 
         # Display children
-        children = [n for n in ideas if n.get('parent') == display_node['id']]
-        if children:
-            st.markdown("**Connected Ideas:**")
-            for child in children:
-                st.markdown(f"- {child['label']} ({child.get('edge_type', 'default')} connection)")
+        child_ids = get_children_index().get(display_id)
+        if child_ids:
+            # One markdown element for the heading and the whole list, built
+            # straight from the child ids without an intermediate node list
+            node_index = get_node_index()
+            st.markdown("**Connected Ideas:**\n\n" + "\n".join(
+                f"- {child['label']} ({child.get('edge_type', 'default')} connection)"
+                for child in map(node_index.__getitem__, child_ids)))
         else:
             st.markdown("**Connected Ideas:** *None*")
     else:
@@ -1872,541 +1687,51 @@ try:
         st.warning("No node selected. Click on a node in the canvas to view its details.")
 
     # Add JavaScript to handle postMessage from iframe - using Streamlit's session state
-    streamlit_js = """
-    <script>
-    // Wait for DOM to be fully loaded before running
-    document.addEventListener('DOMContentLoaded', function() {
-        // Log that this parent window script is loaded
-        console.log('Parent window message handler initialized');
 
-        try {
-            // Create a visible debug element
-            var parentDebugDiv = document.createElement('div');
-            parentDebugDiv.id = 'parent-debug';
-            parentDebugDiv.style.position = 'fixed';
-            parentDebugDiv.style.bottom = '10px';
-            parentDebugDiv.style.right = '10px';
-            parentDebugDiv.style.backgroundColor = 'rgba(0,0,0,0.7)';
-            parentDebugDiv.style.color = 'white';
-            parentDebugDiv.style.padding = '10px';
-            parentDebugDiv.style.borderRadius = '5px';
-            parentDebugDiv.style.fontSize = '12px';
-            parentDebugDiv.style.zIndex = '10000';
-            parentDebugDiv.style.maxWidth = '300px';
-            parentDebugDiv.style.maxHeight = '200px';
-            parentDebugDiv.style.overflow = 'auto';
-            parentDebugDiv.innerHTML = 'Parent window handler active...';
-            
-            // Safe DOM insertion
-            if (document.body) {
-                document.body.appendChild(parentDebugDiv);
-                console.log('Debug overlay created successfully');
-            } else {
-                console.error('Cannot find document.body!');
-            }
+    # Add the Streamlit JS, our custom utils.js (fixes the Streamlit namespace
+    # error) and the position tracking debug API in a single component, along
+    # with any message queue responses collected since the last run
+    page_scripts = PAGE_SCRIPTS_HTML
+    outbox = st.session_state.pop('_msg_outbox', None)
+    if outbox:
+        page_scripts += outbox_html(outbox)
+    st.components.v1.html(page_scripts, height=0)
 
-            function parentDebugLog(message) {
-                console.log(message);
-                if (parentDebugDiv) {
-                    var entry = document.createElement('div');
-                    entry.textContent = new Date().toLocaleTimeString() + ': ' + message;
-                    parentDebugDiv.appendChild(entry);
-                    
-                    // Keep only last 10 messages
-                    while (parentDebugDiv.childNodes.length > 10) {
-                        parentDebugDiv.removeChild(parentDebugDiv.firstChild);
-                    }
-                } else {
-                    console.log('Debug message (no div):', message);
-                }
-            }
 
-            // Helper to process a message no matter how it was received
-            function processMessage(action, payload) {
-                try {
-                    if (!action) {
-                        parentDebugLog('No action provided');
-                        return;
-                    }
-                    
-                    parentDebugLog('Processing message: ' + action);
-                    
-                    // Store in session or local storage as backup
-                    try {
-                        localStorage.setItem('last_message_action', action);
-                        localStorage.setItem('last_message_payload', JSON.stringify(payload));
-                        localStorage.setItem('last_message_time', new Date().toISOString());
-                    } catch (e) {
-                        parentDebugLog('Failed to store in localStorage: ' + e.message);
-                    }
-                    
-                    // Set URL parameters
-                    var params = new URLSearchParams(window.location.search);
-                    params.set('action', action);
-                    params.set('payload', JSON.stringify(payload));
-                    
-                    // Update URL without navigation
-                    try {
-                        window.history.pushState({}, '', window.location.pathname + '?' + params.toString());
-                        parentDebugLog('URL updated with parameters');
-                    } catch (e) {
-                        parentDebugLog('Failed to update URL: ' + e.message);
-                    }
-                    
-                    // Force a page reload to process the message
-                    parentDebugLog('Reloading page to process message');
-                    setTimeout(function() {
-                        location.reload();
-                    }, 100);
-                } catch (e) {
-                    parentDebugLog('Error processing message: ' + e.message);
-                    console.error(e);
-                }
-            }
+except Exception as e:
+    logger.error(f"Unhandled exception: {str(e)}", exc_info=True)
+    handle_exception(e)
 
-            // Listen for messages from the iframe
-            window.addEventListener('message', function(event) {
-                console.log('Received message event', event);
-                parentDebugLog('Received message: ' + JSON.stringify(event.data).substring(0, 50) + '...');
-                
-                // Check if message has the right format
-                if (event.data) {
-                    try {
-                        let action, payload;
-                        
-                        // Try multiple known formats
-                        if (event.data.source === 'network_canvas' && event.data.action) {
-                            // Standard format
-                            action = event.data.action;
-                            payload = event.data.payload;
-                            parentDebugLog('Recognized standard format message');
-                        } else if (event.data.action) {
-                            // Alternative format
-                            action = event.data.action;
-                            payload = event.data.payload;
-                            parentDebugLog('Recognized alternative format message');
-                        } else if (typeof event.data === 'object') {
-                            // Try to infer format
-                            if (event.data.type && event.data.payload) {
-                                action = event.data.type;
-                                payload = event.data.payload;
-                                parentDebugLog('Inferred message format from type/payload');
-                            } else if (event.data.canvas_click || event.data.canvas_dblclick || event.data.canvas_contextmenu) {
-                                // Event-named format
-                                const keys = Object.keys(event.data);
-                                for (const key of keys) {
-                                    if (key.startsWith('canvas_')) {
-                                        action = key;
-                                        payload = event.data[key];
-                                        break;
-                                    }
-                                }
-                                parentDebugLog('Inferred message from event-named keys');
-                            }
-                        }
-                        
-                        if (action) {
-                            processMessage(action, payload);
-                        } else {
-                            parentDebugLog('Could not determine message format: ' + JSON.stringify(event.data).substring(0, 100));
-                        }
-                    } catch (error) {
-                        parentDebugLog('ERROR in message processing: ' + error.message);
-                        console.error(error);
-                    }
-                } else {
-                    parentDebugLog('Empty message received');
-                }
-            });
-            
-            parentDebugLog('Parent handler initialized successfully');
-        } catch (setupError) {
-            console.error('Critical error in parent handler setup:', setupError);
-        }
-    });
-    </script>
-    """
+# Write any debounced save that has come due during this run
+flush_pending_save()
 
-    # Add the Streamlit JS to the page
-    st.components.v1.html(streamlit_js, height=0)
-
-    # Include our custom utils.js file to fix the Streamlit namespace error
-    with open("src/utils.js", "r") as f:
-        utils_js = f.read()
-        st.components.v1.html(
-            f"""
-            <script type="text/javascript">
-            // Immediately define Streamlit namespace to prevent errors
-            if (typeof window.Streamlit === 'undefined') {{
-                window.Streamlit = {{ 
-                    setComponentValue: function() {{ console.log('Streamlit mock: setComponentValue called'); }},
-                    setComponentReady: function() {{ console.log('Streamlit mock: setComponentReady called'); }},
-                    receiveMessageFromPython: function() {{ console.log('Streamlit mock: receiveMessageFromPython called'); }}
-                }};
-                console.log('Created Streamlit namespace mock to prevent errors');
-            }}
-            </script>
-            <script type="text/javascript">
-            {utils_js}
-            </script>
-            """, 
-            height=0
-        )
+# Keep checking while a save is still waiting on its deadline, so the last
+# edit is persisted even if no further interaction triggers a rerun
+_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+if _fragment is not None and has_pending_save():
+    @_fragment(run_every=SAVE_DEBOUNCE_SECONDS)
+    def _pending_save_ticker():
+        flush_pending_save()
 
-    # Add debug API for position tracking
-    js_debug_code = """
-    <script>
-    window.positionDebug = {
-        trackNodes: {},
-        
-        // Start tracking a node's position
-        trackNode: function(nodeId) {
-            if (!nodeId) return;
-            
-            this.trackNodes[nodeId] = {
-                id: nodeId,
-                lastPosition: null,
-                history: []
-            };
-            
-            console.log(`🔍 Started tracking position for node ${nodeId}`);
-            return true;
-        },
-        
-        // Update a tracked node's position (called automatically by the tracking interval)
-        updateNodePosition: function(nodeId) {
-            if (!this.trackNodes[nodeId] || !window.visNetwork) return;
-            
-            try {
-                const positions = window.visNetwork.getPositions([nodeId]);
-                const position = positions[nodeId];
-                
-                if (!position) return;
-                
-                // Store position
-                const tracker = this.trackNodes[nodeId];
-                
-                // Only record if position has changed
-                if (!tracker.lastPosition || 
-                    tracker.lastPosition.x !== position.x || 
-                    tracker.lastPosition.y !== position.y) {
-                    
-                    // Add to history
-                    tracker.history.push({
-                        timestamp: Date.now(),
-                        x: position.x,
-                        y: position.y,
-                        source: 'auto_check'
-                    });
-                    
-                    // Update last position
-                    tracker.lastPosition = { x: position.x, y: position.y };
-                    
-                    console.log(`🔍 Node ${nodeId} position updated to (${position.x}, ${position.y})`);
-                }
-            } catch (e) {
-                console.error(`Error tracking node ${nodeId} position:`, e);
-            }
-        },
-        
-        // Record position update event from dragEnd
-        recordDragEvent: function(nodeId, x, y) {
-            if (!this.trackNodes[nodeId]) {
-                this.trackNode(nodeId);
-            }
-            
-            const tracker = this.trackNodes[nodeId];
-            tracker.lastPosition = { x: x, y: y };
-            tracker.history.push({
-                timestamp: Date.now(),
-                x: x,
-                y: y,
-                source: 'drag_end'
-            });
-            
-            console.log(`🔍 Node ${nodeId} dragged to (${x}, ${y})`);
-        },
-        
-        // Get debugging info
-        getDebugInfo: function(nodeId) {
-            if (!nodeId) {
-                return this.trackNodes;
-            }
-            
-            return this.trackNodes[nodeId] || null;
-        },
-        
-        // Get current position from vis.js
-        getCurrentPosition: function(nodeId) {
-            if (!window.visNetwork) return null;
-            
-            try {
-                const positions = window.visNetwork.getPositions([nodeId]);
-                return positions[nodeId];
-            } catch (e) {
-                console.error(`Error getting position for node ${nodeId}:`, e);
-                return null;
-            }
-        },
-        
-        // Run a diagnostic test for node position persistence
-        testPositionPersistence: function(nodeId) {
-            if (!nodeId || !window.visNetwork) {
-                console.error("Cannot test: Missing nodeId or visNetwork");
-                return {success: false, error: "Missing nodeId or visNetwork"};
-            }
-            
-            try {
-                // Get current position
-                const currentPos = this.getCurrentPosition(nodeId);
-                if (!currentPos) {
-                    return {success: false, error: "Node not found in network"};
-                }
-                
-                console.log(`Current position of node ${nodeId}: (${currentPos.x}, ${currentPos.y})`);
-                
-                // Modify position slightly
-                const newX = currentPos.x + 50;
-                const newY = currentPos.y + 50;
-                
-                // Update position via network
-                window.visNetwork.moveNode(nodeId, newX, newY);
-                console.log(`Moved node ${nodeId} to (${newX}, ${newY})`);
-                
-                // Manually trigger position update
-                const result = window.directParentCommunication.sendMessage('pos', {
-                    id: nodeId,
-                    x: newX,
-                    y: newY
-                });
-                
-                // Show update result
-                console.log(`Position update sent: ${result ? "SUCCESS" : "FAILED"}`);
-                
-                // Store test data
-                const testData = {
-                    nodeId: nodeId,
-                    originalPosition: currentPos,
-                    newPosition: {x: newX, y: newY},
-                    updateSent: result,
-                    timestamp: new Date().toISOString()
-                };
-                
-                // Store test data in localStorage for verification after reload
-                try {
-                    localStorage.setItem('position_test_data', JSON.stringify(testData));
-                } catch(e) {
-                    console.error("Could not save test data:", e);
-                }
-                
-                return {
-                    success: true,
-                    message: "Position update test completed. Reload page to verify persistence.",
-                    testData: testData
-                };
-            } catch(e) {
-                console.error("Position persistence test failed:", e);
-                return {success: false, error: e.message};
-            }
-        },
-        
-        // Verify persistence after page reload
-        verifyPersistence: function() {
-            try {
-                // Get stored test data
-                const testDataStr = localStorage.getItem('position_test_data');
-                if (!testDataStr) {
-                    return {success: false, message: "No test data found. Run testPositionPersistence first."};
-                }
-                
-                const testData = JSON.parse(testDataStr);
-                const nodeId = testData.nodeId;
-                
-                // Get current position after reload
-                if (!window.visNetwork) {
-                    return {success: false, message: "Network not available yet. Try again in a moment."};
-                }
-                
-                const currentPos = this.getCurrentPosition(nodeId);
-                if (!currentPos) {
-                    return {success: false, message: "Node not found after reload"};
-                }
-                
-                // Check if position was maintained
-                const expectedX = testData.newPosition.x;
-                const expectedY = testData.newPosition.y;
-                const currentX = currentPos.x;
-                const currentY = currentPos.y;
-                
-                // Calculate difference (allowing small floating point variations)
-                const xDiff = Math.abs(expectedX - currentX);
-                const yDiff = Math.abs(expectedY - currentY);
-                
-                const success = xDiff < 1 && yDiff < 1;
-                
-                if (success) {
-                    console.log(`✅ POSITION PERSISTENCE TEST PASSED! Node ${nodeId} maintained position (${currentX}, ${currentY})`);
-                } else {
-                    console.error(`❌ POSITION PERSISTENCE TEST FAILED! 
-                        Expected: (${expectedX}, ${expectedY})
-                        Actual: (${currentX}, ${currentY})
-                        Diff: (${xDiff}, ${yDiff})`);
-                }
-                
-                return {
-                    success: success,
-                    message: success ? "Position successfully maintained!" : "Position not maintained correctly",
-                    expected: testData.newPosition,
-                    actual: currentPos,
-                    diff: {x: xDiff, y: yDiff}
-                };
-            } catch(e) {
-                console.error("Verification failed:", e);
-                return {success: false, error: e.message};
-            }
-        }
-    };
-    
-    // Start automatic position tracking
-    setInterval(function() {
-        if (window.visNetwork) {
-            for (const nodeId in window.positionDebug.trackNodes) {
-                window.positionDebug.updateNodePosition(nodeId);
-            }
-        }
-    }, 2000);
-    
-    // Enhance dragEnd handler to record position events
-    if (window.visNetwork) {
-        try {
-            const origDragEnd = window.visNetwork.eventHandlers['dragEnd'];
-            if (origDragEnd) {
-                window.visNetwork.off('dragEnd');
-                window.visNetwork.on('dragEnd', function(params) {
-                    // Call original handler
-                    origDragEnd(params);
-                    
-                    // Record for debugging
-                    if (params.nodes && params.nodes.length > 0) {
-                        const nodeId = params.nodes[0];
-                        const positions = window.visNetwork.getPositions([nodeId]);
-                        if (positions && positions[nodeId]) {
-                            window.positionDebug.recordDragEvent(
-                                nodeId, 
-                                positions[nodeId].x, 
-                                positions[nodeId].y
-                            );
-                        }
-                    }
-                });
-                console.log('Enhanced dragEnd handler for position debugging');
-            }
-        } catch (e) {
-            console.error('Error enhancing dragEnd handler:', e);
-        }
-    }
-    </script>
-    """
-    
-    # Render the debug JavaScript
-    st.components.v1.html(js_debug_code, height=0)
+    _pending_save_ticker()
 
-    # Get network positions for all nodes - add this before the network creation
-    node_positions = {}
-    for n in ideas:
-        if 'id' in n and 'x' in n and 'y' in n and n['x'] is not None and n['y'] is not None:
-            node_id = n['id']
-            x = n['x']
-            y = n['y']
-            # Skip (0,0) positions that might be default
-            if float(x) != 0.0 or float(y) != 0.0:
-                node_positions[node_id] = {'x': float(x), 'y': float(y)}
-    
-    # Insert the position data into the JavaScript
-    position_data_js = f"""
-    <script>
-    // Initialize position data from server
-    window.serverNodePositions = {json.dumps(node_positions)};
-    
-    console.log('📊 Loaded position data for', Object.keys(window.serverNodePositions).length, 'nodes from server');
-    
-    // Debug position data
-    if (Object.keys(window.serverNodePositions).length > 0) {{
-        console.log('📌 Some position samples:');
-        
-        // Log first 3 positions as samples
-        let count = 0;
-        for (const nodeId in window.serverNodePositions) {{
-            if (count < 3) {{
-                console.log(`Node ${{nodeId}}: (${{window.serverNodePositions[nodeId].x}}, ${{window.serverNodePositions[nodeId].y}})`);
-                count++;
-            }} else {{
-                break;
-            }}
-        }}
-    }}
-    </script>
-    """
-    
-    # Add position data initialization to the HTML
-    modified_html += position_data_js
-    
-    # Add code to call ensureNodePositionsApplied
-    position_apply_js = """
-    <script>
-    // Call the position application function when the network is ready
-    var positionApplicationAttempts = 0;
-    var maxPositionApplicationAttempts = 15;
+def _queue_response(response_json: str) -> None:
+    """Queue a response for the frontend and rerun, at most once per QUEUE_RERUN_INTERVAL.
     
-    function attemptPositionApplication() {
-        positionApplicationAttempts++;
-        console.log(`🔄 Attempt ${positionApplicationAttempts}/${maxPositionApplicationAttempts} to apply node positions`);
-        
-        if (window.visNetwork && window.serverNodePositions) {
-            if (typeof ensureNodePositionsApplied === 'function') {
-                const result = ensureNodePositionsApplied();
-                if (result) {
-                    console.log('✅ Successfully applied node positions on attempt', positionApplicationAttempts);
-                    return;
-                }
-            } else {
-                console.warn('⚠️ ensureNodePositionsApplied function not available');
-            }
-        }
-        
-        if (positionApplicationAttempts < maxPositionApplicationAttempts) {
-            // Try again after delay
-            setTimeout(attemptPositionApplication, 500);
-        } else {
-            console.error('❌ Failed to apply positions after max attempts');
-        }
-    }
-    
-    // Start attempts after a short delay to ensure network is initialized
-    setTimeout(function() {
-        attemptPositionApplication();
-    }, 1000);
-    
-    // Also setup periodic check in case network is recreated
-    setInterval(function() {
-        if (window.visNetwork && window.serverNodePositions && 
-            Object.keys(window.serverNodePositions).length > 0) {
-            console.log('⏰ Periodic position application check');
-            if (typeof ensureNodePositionsApplied === 'function') {
-                ensureNodePositionsApplied();
-            }
-        }
-    }, 5000);
-    </script>
+    Responses are delivered together on the next script run; a burst of
+    messages therefore costs one rerun instead of one each. The last
+    response of a burst (nothing left in the message queue) always reruns,
+    so a throttled tail is never left waiting in the outbox.
     """
+    pending = st.session_state.setdefault('_msg_outbox', [])
+    pending.append(response_json)
     
-    # Add position application to the HTML
-    modified_html += position_apply_js
-
-except Exception as e:
-    logger.error(f"Unhandled exception: {str(e)}")
-    logger.error(traceback.format_exc())
-    handle_exception(e)
+    now = time.monotonic()
+    if (not message_queue.has_pending() or
+            len(pending) >= QUEUE_RERUN_MAX_PENDING or
+            now - st.session_state.get('_last_queue_rerun', 0.0) > QUEUE_RERUN_INTERVAL):
+        st.session_state['_last_queue_rerun'] = now
+        st.rerun()
 
 def handle_message_with_queue(message: Message) -> None:
     """Handle a message using the message queue."""
@@ -2417,58 +1742,32 @@ def handle_message_with_queue(message: Message) -> None:
         # Send response back to frontend
         if response:
             response_message = Message.from_dict(response)
-            # Store in session state
-            st.session_state['last_response'] = response_message.to_json()
-            
-            # Send response back to frontend via postMessage
-            js_code = f"""
-            <script>
-                window.parent.postMessage({response_message.to_json()}, '*');
-            </script>
-            """
-            st.components.v1.html(js_code, height=0)
+            # Serialize once for both session state and the frontend
+            response_json = response_message.to_json()
+            st.session_state['last_response'] = response_json
             
-            st.rerun()
+            # Send response back to frontend via postMessage on the next run
+            _queue_response(response_json)
             
     except Exception as e:
         logger.error(f"Error handling message: {str(e)}")
         response = create_response_message(message, 'failed', str(e))
-        st.session_state['last_response'] = response.to_json()
+        response_json = response.to_json()
+        st.session_state['last_response'] = response_json
         
         # Send error response back to frontend
-        js_code = f"""
-        <script>
-            window.parent.postMessage({response.to_json()}, '*');
-        </script>
-        """
-        st.components.v1.html(js_code, height=0)
-        
-        st.rerun()
+        _queue_response(response_json)
 
-# Initialize message queue
-message_queue.start(handle_message_with_queue)
+# Start the message queue worker once per process; it is shared by every
+# session, and stopped at interpreter exit
+message_queue.ensure_started(handle_message_with_queue)
 
 # Handle reinitialization if needed (this happens after importing JSON files)
 if st.session_state.get('reinitialize_message_queue', False):
     # Clear the flag
     del st.session_state['reinitialize_message_queue']
     
-    # Stop and restart the message queue to ensure it works with new data
+    # Drop messages queued against the old data; the worker keeps running
     logger.info("Reinitializing message queue after JSON import")
-    message_queue.stop()
-    time.sleep(0.3)  # Allow time for the thread to fully stop
-    
-    # Verify the queue is stopped
-    logger.info(f"Message queue stopped: thread is {message_queue._worker_thread}")
-    
-    # Restart the queue
-    message_queue.start(handle_message_with_queue)
+    message_queue.drain_and_swap()
     logger.info("Message queue reinitialized after import")
-
-# Add cleanup on app shutdown
-def cleanup():
-    """Clean up resources when the app is shutting down."""
-    message_queue.stop()
-
-# Register cleanup
-atexit.register(cleanup)
\ No newline at end of file
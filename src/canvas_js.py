@@ -0,0 +1,1195 @@
+"""Scripts injected into the page and the PyVis network HTML.
+
+Kept in an imported module so the (large) script text, utils.js and the
+PyVis template are built, read and compiled once per process instead of
+on every Streamlit rerun of main.py.
+"""
+
+import os
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader
+from pyvis import network as pyvis_network
+
+from src import json_utils
+
+# Jinja environment for the PyVis page template, shared by every build. A
+# Network() creates its own environment, so each build would re-read and
+# recompile template.html. The node and edge data the template embeds with
+# |tojson go through json_utils (orjson when installed) instead of
+# json.dumps with sorted keys
+PYVIS_TEMPLATE_ENV = Environment(
+    loader=FileSystemLoader(os.path.join(os.path.dirname(pyvis_network.__file__), 'templates')),
+    auto_reload=False,
+)
+PYVIS_TEMPLATE_ENV.policies['json.dumps_function'] = json_utils.dumps
+PYVIS_TEMPLATE_ENV.policies['json.dumps_kwargs'] = {}
+
+# Direct event listeners for the network canvas: sends click, double-click
+# and context-menu events (with canvas coordinates) back to Streamlit
+DIRECT_JS = """
+<script>
+// Create a hidden form for direct form submissions
+var hiddenForm = document.createElement('form');
+hiddenForm.id = 'hidden-message-form';
+hiddenForm.method = 'GET';
+hiddenForm.target = '_top'; // Target the top window
+hiddenForm.style.display = 'none';
+
+// Add input fields
+var actionInput = document.createElement('input');
+actionInput.type = 'hidden';
+actionInput.id = 'hidden-action-input';
+actionInput.name = 'action';
+
+var payloadInput = document.createElement('input');
+payloadInput.type = 'hidden';
+payloadInput.id = 'hidden-payload-input';
+payloadInput.name = 'payload';
+
+// Add submit button
+var submitButton = document.createElement('button');
+submitButton.type = 'submit';
+submitButton.id = 'hidden-submit-button';
+submitButton.style.display = 'none';
+
+// Assemble the form
+hiddenForm.appendChild(actionInput);
+hiddenForm.appendChild(payloadInput);
+hiddenForm.appendChild(submitButton);
+
+// Add form to document
+document.body.appendChild(hiddenForm);
+
+// Store node positions from the server, with their ids and count cached
+window.serverNodePositions = {}; 
+window._serverNodeIds = [];
+window._serverNodeCount = 0;
+
+// Build the {id: {x, y}} map from the server's id list and its base64 packed
+// little-endian float64 (x, y) pairs
+function decodeNodePositions(ids, xyBase64) {
+    const bin = atob(xyBase64);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) {
+        bytes[i] = bin.charCodeAt(i);
+    }
+    const xy = new Float64Array(bytes.buffer);
+    const positions = {};
+    for (let i = 0; i < ids.length; i++) {
+        positions[ids[i]] = {x: xy[2 * i], y: xy[2 * i + 1]};
+    }
+    return positions;
+}
+
+// Function to explicitly ensure positions from server data are applied to nodes
+function ensureNodePositionsApplied() {
+    if (window.visNetwork && window.serverNodePositions) {
+        console.log('🔧 Explicitly applying stored positions to network');
+        
+        try {
+            if (typeof applyStoredPositions === 'function') {
+                // Use the dedicated function if available
+                applyStoredPositions(window.visNetwork, window.serverNodePositions);
+            } else {
+                // Manual fallback: one DataSet update for all nodes. Ids come
+                // from the DataSet, since the position keys are strings.
+                console.log('📝 Using manual position application');
+                const dataNodes = window.visNetwork.body.data.nodes;
+                const updates = [];
+                dataNodes.getIds().forEach(nodeId => {
+                    const pos = window.serverNodePositions[nodeId];
+                    if (pos && pos.x !== undefined && pos.y !== undefined) {
+                        const x = parseFloat(pos.x);
+                        const y = parseFloat(pos.y);
+                        if (!isNaN(x) && !isNaN(y)) {
+                            updates.push({id: nodeId, x: x, y: y});
+                        }
+                    }
+                });
+                
+                if (updates.length > 0) {
+                    dataNodes.update(updates);
+                }
+                console.log(`Manually applied ${updates.length} node positions`);
+            }
+            
+            // Force network to redraw
+            if (window.visNetwork.redraw) {
+                window.visNetwork.redraw();
+            }
+            
+            console.log('✅ Node positions applied successfully');
+            return true;
+        } catch (error) {
+            console.error('❌ Error applying node positions:', error);
+            return false;
+        }
+    } else {
+        console.warn('⚠️ Cannot apply positions: network or positions not available');
+        return false;
+    }
+}
+
+// Position updates waiting to be sent, keyed by node id. They are flushed
+// once per animation frame, so a burst of drags sends one message.
+var _pendingPos = new Map();
+var _posRafId = 0;
+
+function queuePositionUpdate(nodeId, x, y) {
+    _pendingPos.set(nodeId, {x: x, y: y});
+    if (!_posRafId) {
+        _posRafId = requestAnimationFrame(flushPositionUpdates);
+    }
+}
+
+function flushPositionUpdates() {
+    _posRafId = 0;
+    if (_pendingPos.size === 1) {
+        // A single node keeps the plain 'pos' message
+        const [[nodeId, pos]] = _pendingPos;
+        simpleSendMessage('pos', {id: nodeId, x: pos.x, y: pos.y});
+    } else if (_pendingPos.size > 1) {
+        const positions = [];
+        _pendingPos.forEach(function(pos, nodeId) {
+            positions.push({id: nodeId, x: pos.x, y: pos.y});
+        });
+        console.log(`Sending ${positions.length} position updates in one batch`);
+        simpleSendMessage('pos_batch', {positions: positions});
+    }
+    _pendingPos.clear();
+}
+
+// Attach drag end event handler to the vis.js network
+function setupDragEndHandler() {
+    if (window.visNetwork && window.__dragEndNetwork === window.visNetwork) {
+        // Already attached to this network; the retry, watcher and observer
+        // paths can all get here
+        stopNetworkObserver();
+        return true;
+    }
+    if (window.visNetwork) {
+        console.log('Adding dragEnd event listener to visNetwork');
+        
+        // Add the dragEnd event to track node position changes
+        window.visNetwork.on('dragEnd', function(params) {
+            if (params.nodes && params.nodes.length > 0) {
+                const positions = window.visNetwork.getPositions(params.nodes);
+                if (!window.serverNodePositions) window.serverNodePositions = {};
+                
+                for (const nodeId of params.nodes) {
+                    const nodePosition = positions[nodeId];
+                    if (!nodePosition) continue;
+                    
+                    console.log('Node dragged:', nodeId, 'to position:', nodePosition);
+                    
+                    // Update stored positions
+                    if (!(nodeId in window.serverNodePositions)) {
+                        window._serverNodeIds.push(nodeId);
+                        window._serverNodeCount = window._serverNodeIds.length;
+                    }
+                    window.serverNodePositions[nodeId] = { 
+                        x: nodePosition.x, 
+                        y: nodePosition.y 
+                    };
+                    
+                    // Queue the position update for the backend
+                    queuePositionUpdate(nodeId, nodePosition.x, nodePosition.y);
+                }
+            }
+        });
+        
+        window.__dragEndNetwork = window.visNetwork;
+        console.log('dragEnd event handler attached successfully');
+        
+        // Let the position debug API record drags of this network too
+        announceNetworkToDebugApi(window.visNetwork);
+        
+        // The network is wired up, so stop watching the DOM for it
+        stopNetworkObserver();
+        return true;
+    } else {
+        console.error('visNetwork not available when trying to attach dragEnd handler');
+        return false;
+    }
+}
+
+// Hand the network to window.positionDebug, which is installed in the page
+// scripts frame next to this one rather than in this frame
+function announceNetworkToDebugApi(network) {
+    try {
+        const frames = window.parent.frames;
+        for (let i = 0; i < frames.length; i++) {
+            try {
+                const debugApi = frames[i].positionDebug;
+                if (debugApi && debugApi.attachNetwork) {
+                    debugApi.attachNetwork(network);
+                }
+            } catch (e) {
+                // Frames from another origin can't be inspected
+            }
+        }
+    } catch (e) {
+        console.warn('Could not reach the position debug API:', e);
+    }
+}
+
+// Try to set up the handler with retry logic
+var dragEndSetupAttempts = 0;
+var maxDragEndSetupAttempts = 20; // More attempts with longer total wait time
+
+function attemptDragEndSetup() {
+    dragEndSetupAttempts++;
+    console.log(`Attempt ${dragEndSetupAttempts}/${maxDragEndSetupAttempts} to set up dragEnd handler`);
+    
+    if (setupDragEndHandler()) {
+        console.log('Successfully set up dragEnd handler');
+    } else if (dragEndSetupAttempts < maxDragEndSetupAttempts) {
+        // Try again after a delay, with increasing wait time
+        var delay = 300 + (dragEndSetupAttempts * 100); // Gradually increase delay
+        console.log(`Will retry in ${delay}ms...`);
+        setTimeout(attemptDragEndSetup, delay);
+    } else {
+        console.error('Failed to set up dragEnd handler after maximum attempts');
+    }
+}
+
+// Start trying to set up the handler
+document.addEventListener('DOMContentLoaded', function() {
+    // Initial delay to give network time to initialize
+    setTimeout(attemptDragEndSetup, 1000);
+    
+    // Also watch for the network object to become available
+    var networkWatcher = setInterval(function() {
+        if (window.visNetwork) {
+            clearInterval(networkWatcher);
+            console.log('Network detected by watcher, attempting to attach dragEnd handler');
+            setupDragEndHandler();
+        }
+    }, 300);
+});
+
+// Stop the network mutation observer (safe to call more than once)
+function stopNetworkObserver() {
+    if (window.__netObserverActive && networkObserver) {
+        networkObserver.disconnect();
+        window.__netObserverActive = false;
+    }
+}
+
+// Also add mutation observer to detect when network is added to DOM
+var networkObserver = new MutationObserver(function(mutations) {
+    if (!window.__netObserverActive) return;
+    mutations.forEach(function(mutation) {
+        if (mutation.addedNodes && mutation.addedNodes.length > 0) {
+            for (var i = 0; i < mutation.addedNodes.length; i++) {
+                var node = mutation.addedNodes[i];
+                // Check if the added node is the network container or contains it
+                if (node.id === 'mynetwork' || (node.querySelector && node.querySelector('#mynetwork'))) {
+                    console.log('Network container detected in DOM via MutationObserver');
+                    // Check if we can access the network
+                    setTimeout(function() {
+                        // Try to detect network after the container is added
+                        if (window.visNetwork) {
+                            console.log('Network object available after container detection');
+                            setupDragEndHandler();
+                        } else {
+                            // Try to find the network object in other ways
+                            var networkDiv = document.getElementById('mynetwork');
+                            if (networkDiv) {
+                                console.log('Found network div, looking for network object');
+                                var canvases = networkDiv.querySelectorAll('canvas');
+                                if (canvases.length > 0) {
+                                    for (var j = 0; j < canvases.length; j++) {
+                                        if (canvases[j].network) {
+                                            console.log('Found network object in canvas');
+                                            window.visNetwork = canvases[j].network;
+                                            setupDragEndHandler();
+                                            break;
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }, 500);
+                }
+            }
+        }
+    });
+});
+
+// Start observing document body for changes
+networkObserver.observe(document.body, {
+    childList: true,
+    subtree: true
+});
+window.__netObserverActive = true;
+
+// If the network has not shown up within 10 seconds it is not coming;
+// don't keep taxing every later DOM change
+setTimeout(stopNetworkObserver, 10000);
+
+// Create global helper for direct parent-frame communication using pure postMessage
+window.directParentCommunication = {
+    sendMessage: function(action, payload) {
+        try {
+            console.log('POSTMESSAGE: Sending message to parent: ' + action);
+            
+            // Create the message object
+            var message = {
+                source: 'network_canvas',
+                action: action,
+                payload: payload,
+                timestamp: Date.now()
+            };
+            
+            // Send to parent directly - this works even in sandboxed iframes
+            window.parent.postMessage(message, '*');
+            console.log('POSTMESSAGE: Message sent to parent');
+            return true;
+        } catch(e) {
+            console.error('POSTMESSAGE: Communication failed: ' + e.message);
+            return false;
+        }
+    }
+};
+
+// Communication helper for sending messages to Streamlit
+function simpleSendMessage(action, payload) {
+    try {
+        // Package the message with source identifier
+        var message = {
+            source: 'network_canvas',
+            action: action,
+            payload: payload,
+            timestamp: Date.now()
+        };
+        
+        // Track if any communication method succeeds
+        var communicationSucceeded = false;
+        
+        // Try direct parent communication first (most reliable)
+        try {
+            const directResult = window.directParentCommunication.sendMessage(action, payload);
+            if (directResult) {
+                communicationSucceeded = true;
+                return; // Exit early if successful
+            }
+        } catch(e) {
+            console.error('Direct parent communication failed: ' + e.message);
+        }
+        
+        // Method 1: Send via postMessage (main method)
+        try {
+            // Try multiple targets (sometimes frames can be nested)
+            const targets = [window.parent, window.top, window];
+            
+            for (let i = 0; i < targets.length; i++) {
+                try {
+                    const target = targets[i];
+                    if (target && target !== window) {
+                        target.postMessage(message, '*');
+                        communicationSucceeded = true;
+                        break;
+                    }
+                } catch (e) {
+                    console.error(`Failed to send to target ${i}: ${e.message}`);
+                }
+            }
+            
+            if (!communicationSucceeded) {
+                // Try standard window.parent as last resort
+                window.parent.postMessage(message, '*');
+                communicationSucceeded = true;
+            }
+        } catch(e) {
+            console.error('All postMessage attempts failed: ' + e.message);
+        }
+        
+        // Method 3: BroadcastChannel, with a single localStorage write only
+        // for browsers that lack it (the envelope's timestamp makes the
+        // storage event fire even for repeated messages)
+        if (!communicationSucceeded) {
+            try {
+                if ('BroadcastChannel' in window) {
+                    window.__mmChan = window.__mmChan || new BroadcastChannel('mindmap');
+                    window.__mmChan.postMessage(message);
+                    communicationSucceeded = true;
+                } else if (window.localStorage) {
+                    localStorage.setItem('mindmap_message', JSON.stringify(message));
+                    communicationSucceeded = true;
+                }
+            } catch(e) {
+                console.error('BroadcastChannel/localStorage method failed: ' + e.message);
+            }
+        }
+        
+        // Method 4: Form submission as last resort
+        if (!communicationSucceeded) {
+            try {
+                var form = document.getElementById('hidden-message-form');
+                var actionInput = document.getElementById('hidden-action-input');
+                var payloadInput = document.getElementById('hidden-payload-input');
+                
+                if (form && actionInput && payloadInput) {
+                    actionInput.value = action;
+                    payloadInput.value = JSON.stringify(payload);
+                    form.submit();
+                    communicationSucceeded = true;
+                }
+            } catch(e) {
+                console.error('Form submission method failed: ' + e.message);
+            }
+        }
+    } catch(e) {
+        console.error('CRITICAL ERROR in simpleSendMessage: ' + e.message);
+    }
+}
+
+// Add a simplified click handler
+document.addEventListener('DOMContentLoaded', function() {
+    // Find the canvas container
+    var networkDiv = document.getElementById('mynetwork');
+    if (!networkDiv) {
+        console.error('ERROR: mynetwork div not found');
+        return;
+    }
+    
+    // The vis-network canvas receives the pointer events; fall back to the
+    // container if it has not been created yet
+    var canvasEl = networkDiv.querySelector('canvas') || networkDiv;
+
+    // Cache the container rect and refresh it only when the container
+    // resizes, so handlers never force a layout
+    var cachedRect = networkDiv.getBoundingClientRect();
+    if (window.ResizeObserver) {
+        new ResizeObserver(function() {
+            cachedRect = networkDiv.getBoundingClientRect();
+        }).observe(networkDiv);
+    }
+
+    // Build the coordinate payload relative to the container
+    function canvasPayload(event) {
+        return {
+            x: event.clientX - cachedRect.left,
+            y: event.clientY - cachedRect.top,
+            canvasWidth: cachedRect.width,
+            canvasHeight: cachedRect.height,
+            timestamp: Date.now()
+        };
+    }
+
+    // Add the global click handler
+    canvasEl.addEventListener('click', function(event) {
+        simpleSendMessage('canvas_click', canvasPayload(event));
+    }, {passive: true});
+
+    // Add double-click handler for editing (not passive: it suppresses
+    // the browser's default double-click selection)
+    canvasEl.addEventListener('dblclick', function(event) {
+        simpleSendMessage('canvas_dblclick', canvasPayload(event));
+        event.preventDefault();
+    });
+
+    // Show a small in-canvas Yes/No prompt at the click position; unlike
+    // confirm() it does not block the page while it is open
+    var deletePrompt = null;
+    function closeDeletePrompt() {
+        if (deletePrompt) {
+            deletePrompt.remove();
+            deletePrompt = null;
+        }
+    }
+    function showDeletePrompt(payload) {
+        closeDeletePrompt();
+        deletePrompt = document.createElement('div');
+        deletePrompt.style.cssText = 'position:absolute;z-index:1000;padding:8px 10px;' +
+            'background:#fff;border:1px solid #ccc;border-radius:4px;' +
+            'box-shadow:0 2px 6px rgba(0,0,0,0.2);font:13px sans-serif;';
+        deletePrompt.style.left = payload.x + 'px';
+        deletePrompt.style.top = payload.y + 'px';
+        deletePrompt.appendChild(document.createTextNode('Delete this bubble? '));
+
+        var yesButton = document.createElement('button');
+        yesButton.textContent = 'Yes';
+        yesButton.style.marginRight = '4px';
+        yesButton.addEventListener('click', function() {
+            closeDeletePrompt();
+            // Send the right-click event
+            simpleSendMessage('canvas_contextmenu', payload);
+        });
+        var noButton = document.createElement('button');
+        noButton.textContent = 'No';
+        noButton.addEventListener('click', closeDeletePrompt);
+
+        deletePrompt.appendChild(yesButton);
+        deletePrompt.appendChild(noButton);
+        networkDiv.appendChild(deletePrompt);
+    }
+
+    // Add context menu handler for deleting
+    canvasEl.addEventListener('contextmenu', function(event) {
+        // Prevent default browser context menu
+        event.preventDefault();
+
+        // Confirm deletion
+        showDeletePrompt(canvasPayload(event));
+
+        return false;
+    });
+});
+</script>
+"""
+
+# Parent-window message handler: receives messages from the canvas iframe
+# and forwards them to Streamlit
+STREAMLIT_JS = """
+<script>
+// Wait for DOM to be fully loaded before running
+document.addEventListener('DOMContentLoaded', function() {
+    // Log that this parent window script is loaded
+    console.log('Parent window message handler initialized');
+
+    try {
+        // The on-page debug overlay is opt-in: localStorage.setItem('mindmap_debug', '1')
+        var debugEnabled = false;
+        try {
+            debugEnabled = !!localStorage.getItem('mindmap_debug');
+        } catch (e) {}
+        window.__MINDMAP_DEBUG = debugEnabled;
+
+        var parentDebugDiv = null;
+        if (window.__MINDMAP_DEBUG) {
+            // Create a visible debug element
+            parentDebugDiv = document.createElement('div');
+            parentDebugDiv.id = 'parent-debug';
+            parentDebugDiv.style.cssText = 'position:fixed;bottom:10px;right:10px;' +
+                'background-color:rgba(0,0,0,0.7);color:white;padding:10px;border-radius:5px;' +
+                'font-size:12px;z-index:10000;max-width:300px;max-height:200px;overflow:auto;';
+            parentDebugDiv.textContent = 'Parent window handler active...';
+            
+            // Safe DOM insertion
+            if (document.body) {
+                document.body.appendChild(parentDebugDiv);
+                console.log('Debug overlay created successfully');
+            } else {
+                console.error('Cannot find document.body!');
+            }
+        }
+
+        function parentDebugLog(message) {
+            if (!window.__MINDMAP_DEBUG) {
+                return;
+            }
+            console.log(message);
+            if (parentDebugDiv) {
+                var entry = document.createElement('div');
+                entry.textContent = new Date().toLocaleTimeString() + ': ' + message;
+                parentDebugDiv.appendChild(entry);
+                
+                // Keep only last 10 messages
+                while (parentDebugDiv.childNodes.length > 10) {
+                    parentDebugDiv.removeChild(parentDebugDiv.firstChild);
+                }
+            }
+        }
+
+        // Error path shared by the message handlers, kept out of line so
+        // they only contain the success path
+        function onMessageError(context, e) {
+            parentDebugLog(context + e.message);
+            console.error(e);
+        }
+
+        // Helper to process a message no matter how it was received
+        function processMessage(action, payload) {
+            try {
+                if (!action) {
+                    parentDebugLog('No action provided');
+                    return;
+                }
+                
+                parentDebugLog('Processing message: ' + action);
+                
+                // Store in session or local storage as backup
+                try {
+                    localStorage.setItem('last_message_action', action);
+                    localStorage.setItem('last_message_payload', JSON.stringify(payload));
+                    localStorage.setItem('last_message_time', new Date().toISOString());
+                } catch (e) {
+                    parentDebugLog('Failed to store in localStorage: ' + e.message);
+                }
+                
+                // Record the message in the URL and reload so the app's next
+                // run handles it: components.html has no channel back to
+                // Python, so the query string is the only way in
+                var params = new URLSearchParams(window.location.search);
+                params.set('action', action);
+                params.set('payload', JSON.stringify(payload));
+
+                try {
+                    window.history.replaceState({}, '', window.location.pathname + '?' + params.toString());
+                    parentDebugLog('URL updated with parameters');
+                } catch (e) {
+                    parentDebugLog('Failed to update URL: ' + e.message);
+                }
+
+                // Force a page reload to process the message
+                parentDebugLog('Reloading page to process message');
+                setTimeout(function() {
+                    location.reload();
+                }, 100);
+            } catch (e) {
+                onMessageError('Error processing message: ', e);
+            }
+        }
+
+        // Message keys that carry the action name in the event-named format
+        const CANVAS_KEYS = ['canvas_click', 'canvas_dblclick', 'canvas_contextmenu'];
+
+        // Pull the action and payload out of any of the known message formats
+        function extractMessage(data) {
+            if (data.action) {
+                // Standard format ({source, action, payload}), whatever the
+                // source; network_canvas messages need no separate arm
+                return {action: data.action, payload: data.payload};
+            }
+            if (data.type && data.payload) {
+                // type/payload format
+                return {action: data.type, payload: data.payload};
+            }
+            for (const key of CANVAS_KEYS) {
+                if (data[key]) {
+                    // Event-named format ({canvas_click: payload})
+                    return {action: key, payload: data[key]};
+                }
+            }
+            return null;
+        }
+
+        // Short description of a message for the debug log, built from its
+        // top-level keys instead of serializing the whole payload
+        function describeMessage(data) {
+            if (typeof data !== 'object') {
+                return String(data).substring(0, 50);
+            }
+            const keys = Object.keys(data);
+            let text = '{' + keys.slice(0, 4).join(', ') + (keys.length > 4 ? ', ...' : '') + '}';
+            const action = data.action || data.type;
+            if (typeof action === 'string') {
+                text += ' action=' + action;
+            }
+            return text;
+        }
+
+        // Listen for messages from the iframe
+        window.addEventListener('message', function(event) {
+            const data = event.data;
+            if (window.__MINDMAP_DEBUG) {
+                parentDebugLog('Received message: ' + describeMessage(data));
+            }
+            
+            if (!data) {
+                parentDebugLog('Empty message received');
+                return;
+            }
+            
+            try {
+                const message = typeof data === 'object' ? extractMessage(data) : null;
+                if (message) {
+                    processMessage(message.action, message.payload);
+                } else if (window.__MINDMAP_DEBUG) {
+                    parentDebugLog('Could not determine message format: ' + describeMessage(data));
+                }
+            } catch (error) {
+                onMessageError('ERROR in message processing: ', error);
+            }
+        });
+        
+        parentDebugLog('Parent handler initialized successfully');
+    } catch (setupError) {
+        console.error('Critical error in parent handler setup:', setupError);
+    }
+});
+</script>
+"""
+
+# src/utils.js, read once at import; it defines the Streamlit namespace mock
+# before anything else runs
+UTILS_JS = (Path(__file__).parent / 'utils.js').read_text(encoding='utf-8')
+UTILS_JS_HTML = """<script type="text/javascript">
+""" + UTILS_JS + """
+</script>
+"""
+
+# Debug API for tracking node positions (window.positionDebug)
+POSITION_DEBUG_JS = """
+<script>
+// Install once per page; reruns that re-inject this script must not add
+// another dragEnd listener
+if (!window._mindmap_debug_installed) {
+    window._mindmap_debug_installed = true;
+    
+    window.positionDebug = {
+        trackNodes: {},
+        // Ids of trackNodes, maintained by trackNode()
+        _trackedIds: [],
+    
+        // Samples kept per tracked node, and the sources they can come from
+        HISTORY_CAP: 256,
+        SOURCES: ['auto_check', 'drag_end', 'move'],
+    
+        // Start tracking a node's position. History is a ring buffer of parallel
+        // typed arrays, so recording a sample allocates nothing.
+        trackNode: function(nodeId) {
+            if (!nodeId) return;
+        
+            const cap = this.HISTORY_CAP;
+            if (!this.trackNodes[nodeId]) this._trackedIds.push(nodeId);
+            this.trackNodes[nodeId] = {
+                id: nodeId,
+                hasPosition: false,
+                lastX: 0,
+                lastY: 0,
+                ts: new Float64Array(cap),
+                x: new Float64Array(cap),
+                y: new Float64Array(cap),
+                src: new Uint8Array(cap),
+                head: 0,
+                len: 0
+            };
+        
+            console.log(`🔍 Started tracking position for node ${nodeId}`);
+            return true;
+        },
+    
+        // Error path for the tracking methods, kept out of line
+        _onTrackError: function(context, e) {
+            console.error(context, e);
+        },
+    
+        // Append a sample to a tracker's ring buffer and make it the last position
+        _record: function(tracker, x, y, source) {
+            const i = tracker.head;
+            tracker.ts[i] = Date.now();
+            tracker.x[i] = x;
+            tracker.y[i] = y;
+            tracker.src[i] = source;
+            tracker.head = (i + 1) % tracker.ts.length;
+            if (tracker.len < tracker.ts.length) tracker.len++;
+        
+            tracker.hasPosition = true;
+            tracker.lastX = x;
+            tracker.lastY = y;
+        },
+    
+        // Record a position read from the network if it has changed
+        _checkPosition: function(nodeId, position) {
+            if (!position) return;
+        
+            const tracker = this.trackNodes[nodeId];
+            const x = position.x;
+            const y = position.y;
+        
+            // Unchanged is the common case: a single combined compare, no allocation
+            if (tracker.hasPosition & (tracker.lastX === x) & (tracker.lastY === y)) return;
+        
+            this._record(tracker, x, y, 0);
+        
+            console.log(`🔍 Node ${nodeId} position updated to (${x}, ${y})`);
+        },
+    
+        // Read a tracked node's current position from the network (manual diagnostic;
+        // drags and programmatic moves are recorded as they happen)
+        updateNodePosition: function(nodeId) {
+            if (!this.trackNodes[nodeId] || !window.visNetwork) return;
+        
+            try {
+                const positions = window.visNetwork.getPositions([nodeId]);
+                this._checkPosition(nodeId, positions[nodeId]);
+            } catch (e) {
+                this._onTrackError(`Error tracking node ${nodeId} position:`, e);
+            }
+        },
+    
+        // Same as updateNodePosition for every tracked node, with a single
+        // getPositions() call for all of them
+        updateAllPositions: function() {
+            if (!window.visNetwork) return;
+        
+            const ids = this._trackedIds;
+            if (ids.length === 0) return;
+        
+            try {
+                const positions = window.visNetwork.getPositions(ids.map(id => this.trackNodes[id].id));
+                for (const id of ids) {
+                    this._checkPosition(id, positions[this.trackNodes[id].id]);
+                }
+            } catch (e) {
+                this._onTrackError('Error tracking node positions:', e);
+            }
+        },
+    
+        // Record position update event from dragEnd
+        recordDragEvent: function(nodeId, x, y) {
+            if (!this.trackNodes[nodeId]) {
+                this.trackNode(nodeId);
+            }
+        
+            this._record(this.trackNodes[nodeId], x, y, 1);
+        
+            console.log(`🔍 Node ${nodeId} dragged to (${x}, ${y})`);
+        },
+    
+        // Record a programmatic move (e.g. visNetwork.moveNode) of a tracked node
+        notifyMove: function(nodeId, x, y) {
+            const tracker = this.trackNodes[nodeId];
+            if (!tracker) return;
+        
+            this._record(tracker, x, y, 2);
+        },
+    
+        // Readable view of a tracker, with its history oldest first
+        _describe: function(tracker) {
+            const cap = tracker.ts.length;
+            const history = [];
+            for (let k = 0; k < tracker.len; k++) {
+                const i = (tracker.head - tracker.len + k + cap) % cap;
+                history.push({
+                    timestamp: tracker.ts[i],
+                    x: tracker.x[i],
+                    y: tracker.y[i],
+                    source: this.SOURCES[tracker.src[i]]
+                });
+            }
+            return {
+                id: tracker.id,
+                lastPosition: tracker.hasPosition ? { x: tracker.lastX, y: tracker.lastY } : null,
+                history: history
+            };
+        },
+    
+        // Get debugging info
+        getDebugInfo: function(nodeId) {
+            if (!nodeId) {
+                const info = {};
+                for (const id of this._trackedIds) {
+                    info[id] = this._describe(this.trackNodes[id]);
+                }
+                return info;
+            }
+        
+            const tracker = this.trackNodes[nodeId];
+            return tracker ? this._describe(tracker) : null;
+        },
+    
+        // Get current position from vis.js
+        getCurrentPosition: function(nodeId) {
+            if (!window.visNetwork) return null;
+        
+            try {
+                const positions = window.visNetwork.getPositions([nodeId]);
+                return positions[nodeId];
+            } catch (e) {
+                console.error(`Error getting position for node ${nodeId}:`, e);
+                return null;
+            }
+        },
+    
+        // Run a diagnostic test for node position persistence
+        testPositionPersistence: function(nodeId) {
+            if (!nodeId || !window.visNetwork) {
+                console.error("Cannot test: Missing nodeId or visNetwork");
+                return {success: false, error: "Missing nodeId or visNetwork"};
+            }
+        
+            try {
+                // Get current position
+                const currentPos = this.getCurrentPosition(nodeId);
+                if (!currentPos) {
+                    return {success: false, error: "Node not found in network"};
+                }
+            
+                console.log(`Current position of node ${nodeId}: (${currentPos.x}, ${currentPos.y})`);
+            
+                // Modify position slightly
+                const newX = currentPos.x + 50;
+                const newY = currentPos.y + 50;
+            
+                // Update position via network
+                window.visNetwork.moveNode(nodeId, newX, newY);
+                this.notifyMove(nodeId, newX, newY);
+                console.log(`Moved node ${nodeId} to (${newX}, ${newY})`);
+            
+                // Manually trigger position update
+                const result = window.directParentCommunication.sendMessage('pos', {
+                    id: nodeId,
+                    x: newX,
+                    y: newY
+                });
+            
+                // Show update result
+                console.log(`Position update sent: ${result ? "SUCCESS" : "FAILED"}`);
+            
+                // Store test data
+                const testData = {
+                    nodeId: nodeId,
+                    originalPosition: currentPos,
+                    newPosition: {x: newX, y: newY},
+                    updateSent: result,
+                    timestamp: new Date().toISOString()
+                };
+            
+                // Store test data in localStorage for verification after reload
+                try {
+                    localStorage.setItem('position_test_data', JSON.stringify(testData));
+                } catch(e) {
+                    console.error("Could not save test data:", e);
+                }
+            
+                return {
+                    success: true,
+                    message: "Position update test completed. Reload page to verify persistence.",
+                    testData: testData
+                };
+            } catch(e) {
+                this._onTrackError("Position persistence test failed:", e);
+                return {success: false, error: e.message};
+            }
+        },
+    
+        // Verify persistence after page reload
+        verifyPersistence: function() {
+            try {
+                // Get stored test data
+                const testDataStr = localStorage.getItem('position_test_data');
+                if (!testDataStr) {
+                    return {success: false, message: "No test data found. Run testPositionPersistence first."};
+                }
+            
+                const testData = JSON.parse(testDataStr);
+                const nodeId = testData.nodeId;
+            
+                // Get current position after reload
+                if (!window.visNetwork) {
+                    return {success: false, message: "Network not available yet. Try again in a moment."};
+                }
+            
+                const currentPos = this.getCurrentPosition(nodeId);
+                if (!currentPos) {
+                    return {success: false, message: "Node not found after reload"};
+                }
+            
+                // Check if position was maintained
+                const expectedX = testData.newPosition.x;
+                const expectedY = testData.newPosition.y;
+                const currentX = currentPos.x;
+                const currentY = currentPos.y;
+            
+                // Calculate difference (allowing small floating point variations)
+                const xDiff = Math.abs(expectedX - currentX);
+                const yDiff = Math.abs(expectedY - currentY);
+            
+                const success = xDiff < 1 && yDiff < 1;
+            
+                if (success) {
+                    console.log(`✅ POSITION PERSISTENCE TEST PASSED! Node ${nodeId} maintained position (${currentX}, ${currentY})`);
+                } else {
+                    console.error(`❌ POSITION PERSISTENCE TEST FAILED! 
+                        Expected: (${expectedX}, ${expectedY})
+                        Actual: (${currentX}, ${currentY})
+                        Diff: (${xDiff}, ${yDiff})`);
+                }
+            
+                return {
+                    success: success,
+                    message: success ? "Position successfully maintained!" : "Position not maintained correctly",
+                    expected: testData.newPosition,
+                    actual: currentPos,
+                    diff: {x: xDiff, y: yDiff}
+                };
+            } catch(e) {
+                console.error("Verification failed:", e);
+                return {success: false, error: e.message};
+            }
+        },
+    
+        // Record drag events of a vis.js network for debugging. The network
+        // lives in the canvas frame, which hands it over once its own dragEnd
+        // handler is attached; positions only change through drags and
+        // programmatic moves, so there is no polling. Each network is hooked
+        // once, and vis.js keeps its other dragEnd listeners alongside this one
+        attachNetwork: function(network) {
+            if (!network || network === this._network) return false;
+            this._network = network;
+            // The rest of the API reads positions from window.visNetwork
+            window.visNetwork = network;
+            try {
+                network.on('dragEnd', function(params) {
+                    if (params.nodes && params.nodes.length > 0) {
+                        const positions = network.getPositions(params.nodes);
+                        for (const nodeId of params.nodes) {
+                            if (positions && positions[nodeId]) {
+                                window.positionDebug.recordDragEvent(
+                                    nodeId, 
+                                    positions[nodeId].x, 
+                                    positions[nodeId].y
+                                );
+                            }
+                        }
+                    }
+                });
+                console.log('Added dragEnd listener for position debugging');
+                return true;
+            } catch (e) {
+                console.error('Error enhancing dragEnd handler:', e);
+                return false;
+            }
+        }
+    };
+
+    // Pick up a canvas whose network was ready before this script ran; later
+    // networks are handed over through attachNetwork
+    try {
+        const frames = window.parent.frames;
+        for (let i = 0; i < frames.length; i++) {
+            try {
+                if (frames[i].visNetwork) {
+                    window.positionDebug.attachNetwork(frames[i].visNetwork);
+                    break;
+                }
+            } catch (e) {
+                // Frames from another origin can't be inspected
+            }
+        }
+    } catch (e) {
+        console.warn('Could not look for the network frame:', e);
+    }
+}
+</script>
+"""
+
+# Applies the server node positions once the network is ready
+POSITION_APPLY_JS = """
+<script>
+// Call the position application function when the network is ready
+var positionApplicationAttempts = 0;
+var maxPositionApplicationAttempts = 15;
+
+function attemptPositionApplication() {
+    positionApplicationAttempts++;
+    console.log(`🔄 Attempt ${positionApplicationAttempts}/${maxPositionApplicationAttempts} to apply node positions`);
+    
+    if (window.visNetwork && window.serverNodePositions) {
+        if (typeof ensureNodePositionsApplied === 'function') {
+            const result = ensureNodePositionsApplied();
+            if (result) {
+                console.log('✅ Successfully applied node positions on attempt', positionApplicationAttempts);
+                return;
+            }
+        } else {
+            console.warn('⚠️ ensureNodePositionsApplied function not available');
+        }
+    }
+    
+    if (positionApplicationAttempts < maxPositionApplicationAttempts) {
+        // Try again after delay
+        setTimeout(attemptPositionApplication, 500);
+    } else {
+        console.error('❌ Failed to apply positions after max attempts');
+    }
+}
+
+// Install the timers once per page, however often this script is injected
+if (!window._posApplyInstalled) {
+    window._posApplyInstalled = true;
+    
+    // Start attempts after a short delay to ensure network is initialized
+    setTimeout(function() {
+        attemptPositionApplication();
+    }, 1000);
+    
+    // Also setup periodic check in case network is recreated
+    setInterval(function() {
+        if (window.visNetwork && window._serverNodeCount > 0) {
+            console.log('⏰ Periodic position application check');
+            if (typeof ensureNodePositionsApplied === 'function') {
+                ensureNodePositionsApplied();
+            }
+        }
+    }, 5000);
+}
+</script>
+"""
+
+# Turns physics off once the initial layout has stabilized (used for large maps)
+PHYSICS_OFF_AFTER_STABILIZATION_JS = """
+<script>
+if (window.visNetwork) {
+    window.visNetwork.once('stabilizationIterationsDone', function() {
+        window.visNetwork.setOptions({physics: false});
+    });
+}
+</script>
+"""
+
+# Page-level scripts, injected together through one component
+PAGE_SCRIPTS_HTML = STREAMLIT_JS + UTILS_JS_HTML + POSITION_DEBUG_JS
+
+# Fixed reader for queued backend responses. The responses themselves are
+# embedded as one JSON data block (see outbox_html), parsed once and posted
+# as objects, so no per-message script is generated.
+OUTBOX_READER_JS = """
+<script>
+(function() {
+    var el = document.getElementById('mindmap-outbox');
+    if (!el) return;
+    try {
+        var messages = JSON.parse(el.textContent);
+        for (var i = 0; i < messages.length; i++) {
+            window.parent.postMessage(messages[i], '*');
+        }
+    } catch (e) {
+        console.error('Error delivering queued responses:', e);
+    }
+})();
+</script>
+"""
+
+
+def outbox_html(response_jsons):
+    """Return the outbox data block plus its reader for serialized responses."""
+    # '</' would close the data block early; '<\\/' is the same JSON string
+    data = ('[' + ','.join(response_jsons) + ']').replace('</', '<\\/')
+    return ('<script type="application/json" id="mindmap-outbox">' + data +
+            '</script>' + OUTBOX_READER_JS)
+
+
+# Tail of the script that publishes the server's node positions: everything
+# after the decodeNodePositions() arguments, which server_positions_html fills in
+_SERVER_POSITIONS_TAIL_JS = """);
+// Node ids and count, kept alongside so consumers don't rebuild them
+window._serverNodeIds = Object.keys(window.serverNodePositions);
+window._serverNodeCount = window._serverNodeIds.length;
+
+console.log('📊 Loaded position data for', window._serverNodeCount, 'nodes from server');
+
+// Debug position data
+if (window._serverNodeCount > 0) {
+    console.log('📌 Some position samples:');
+    
+    // Log first 3 positions as samples
+    for (const nodeId of window._serverNodeIds.slice(0, 3)) {
+        console.log(`Node ${nodeId}: (${window.serverNodePositions[nodeId].x}, ${window.serverNodePositions[nodeId].y})`);
+    }
+}
+</script>
+"""
+
+
+def server_positions_html(ids_json, xy_base64):
+    """Return the script that sets window.serverNodePositions from encoded positions."""
+    # '</' in an id would close the script early; '<\\/' is the same JSON string
+    return ('<script>\n// Initialize position data from server\n'
+            'window.serverNodePositions = decodeNodePositions(' + ids_json.replace('</', '<\\/') +
+            ', "' + xy_base64 + '"' + _SERVER_POSITIONS_TAIL_JS)
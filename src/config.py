@@ -30,13 +30,30 @@ DEFAULT_SETTINGS = {
     }
 }
 
+# Minimum delay between writes for frequent edits (clicks, drags), in seconds
+SAVE_DEBOUNCE_SECONDS = 0.5
+
+# Message queue responses: minimum seconds between reruns, and the backlog
+# size that forces a rerun anyway
+QUEUE_RERUN_INTERVAL = 0.05
+QUEUE_RERUN_MAX_PENDING = 20
+
+# Node List sidebar: nodes listed per page (more are shown with "Load more")
+NODE_LIST_PAGE_SIZE = 50
+
 # Network configuration
 NETWORK_CONFIG = {
     'gravity': -2000,
     'central_gravity': 0.3,
     'spring_length': 50,
     'damping': 0.09,
-    'overlap': 0
+    'overlap': 0,
+    # Cap on the physics iterations run to stabilize the layout on load
+    'stabilization_iterations': 200,
+    'min_velocity': 0.75,
+    'timestep': 0.5,
+    # Maps with more nodes than this turn physics off once stabilized
+    'physics_off_node_threshold': 200
 }
 
 # Canvas dimensions
@@ -49,6 +66,9 @@ CANVAS_DIMENSIONS = {
 PRIMARY_NODE_BORDER = 2
 RGBA_ALPHA = 0.7
 
+# Click hit radius: this fraction of the smaller canvas dimension, plus the node size
+CLICK_THRESHOLD_RATIO = 0.08
+
 # Error messages
 ERROR_MESSAGES = {
     'load_data': "Error loading data: {error}",
@@ -1,7 +1,7 @@
 # Message/event handlers and error handling for MindMap
 import streamlit as st
 import logging
-from src.state import get_ideas, get_central, set_central, get_next_id, increment_next_id, add_idea, set_ideas, get_store, save_data
+from src.state import get_ideas, get_central, set_central, get_next_id, increment_next_id, add_idea, set_ideas, get_store, save_data, get_children_index, get_node_index
 from src.history import save_state_to_history, perform_undo, perform_redo
 from src.utils import recalc_size, collect_descendants, find_node_by_id, find_closest_node, handle_error, validate_node_exists, validate_payload, extract_canvas_coordinates, standard_response
 from src.message_format import Message, validate_message, create_response_message
@@ -30,10 +30,13 @@ def handle_exception(e):
     st.error(error_msg)
     st.exception(e)
 
-def is_circular(child_id, parent_id, nodes):
+def is_circular(child_id, parent_id, nodes, node_index=None):
     """
     Check if making parent_id a parent of child_id would create a circular reference.
     Uses an optimized algorithm to detect cycles.
+    
+    node_index is an optional ID -> node map for nodes; with it each step up
+    the parent chain is a dict lookup instead of a scan of nodes.
     """
     if child_id == parent_id:
         return True
@@ -52,7 +55,7 @@ def is_circular(child_id, parent_id, nodes):
         visited.add(current_id)
         
         # Find the parent node
-        parent_node = find_node_by_id(nodes, current_id)
+        parent_node = find_node_by_id(nodes, current_id, node_index=node_index)
         if not parent_node:
             return False
             
@@ -129,7 +132,7 @@ def handle_edit_modal(message: Message) -> Dict[str, Any]:
         node_id = validated_payload['id']
         
         # Validate node exists
-        success, node, error_msg = validate_node_exists(node_id, ideas, 'edit modal')
+        success, node, error_msg = validate_node_exists(node_id, ideas, 'edit modal', node_index=get_node_index())
         if success:
             st.session_state['edit_node'] = node_id
             st.rerun()
@@ -162,7 +165,7 @@ def handle_select_node(message: Message) -> Dict[str, Any]:
         logger.info(f"Processing select_node action for node ID: {node_id}")
         
         # Use the validation utility
-        success, node, error_msg = validate_node_exists(node_id, ideas, 'select')
+        success, node, error_msg = validate_node_exists(node_id, ideas, 'select', node_index=get_node_index())
         if success:
             logger.info(f"Node {node_id} found, setting as selected node")
             st.session_state['selected_node'] = node_id
@@ -194,7 +197,7 @@ def handle_center_node(message: Message) -> Dict[str, Any]:
         node_id = validated_payload['id']
         
         # Use the validation utility
-        success, node, error_msg = validate_node_exists(node_id, ideas, 'center')
+        success, node, error_msg = validate_node_exists(node_id, ideas, 'center', node_index=get_node_index())
         if success:
             set_central(node_id)
             st.rerun()
@@ -229,13 +232,13 @@ def handle_delete_node(message: Message) -> Dict[str, Any]:
             return standard_response(message, False, "Missing node id")
         
         # Use the validation utility
-        success, node, error_msg = validate_node_exists(node_id, ideas, 'delete')
+        success, node, error_msg = validate_node_exists(node_id, ideas, 'delete', node_index=get_node_index())
         if not success:
             logger.warning(error_msg)
             return standard_response(message, False, 'Node not found')
             
-        # Use the utility function to collect descendants
-        to_remove = collect_descendants(node_id, ideas)
+        # Walk the subtree with the cached parent -> children index
+        to_remove = collect_descendants(node_id, ideas, children_index=get_children_index())
         
         set_ideas([n for n in ideas if n['id'] not in to_remove])
         
@@ -277,17 +280,18 @@ def handle_reparent_node(message: Message) -> Dict[str, Any]:
         parent_id = validated_payload['parent']
         
         # Validate that both nodes exist
-        child_success, child, child_error = validate_node_exists(child_id, ideas, 'reparent child')
+        node_index = get_node_index()
+        child_success, child, child_error = validate_node_exists(child_id, ideas, 'reparent child', node_index=node_index)
         if not child_success:
             logger.warning(child_error)
             return standard_response(message, False, 'Child node not found')
         
-        parent_success, parent, parent_error = validate_node_exists(parent_id, ideas, 'reparent parent')
+        parent_success, parent, parent_error = validate_node_exists(parent_id, ideas, 'reparent parent', node_index=node_index)
         if not parent_success:
             logger.warning(parent_error)
             return standard_response(message, False, 'Parent node not found')
         
-        if is_circular(child_id, parent_id, ideas):
+        if is_circular(child_id, parent_id, ideas, node_index=node_index):
             logger.warning(f"Circular reference detected: {child_id} -> {parent_id}")
             return standard_response(message, False, 'Cannot create circular parent-child relationships')
             
@@ -395,7 +399,7 @@ def handle_edit_node(message: Message) -> Dict[str, Any]:
         node_id = validated_payload.get('node_id', validated_payload.get('id'))
         
         # Use the validation utility
-        success, node, error_msg = validate_node_exists(node_id, ideas, 'edit')
+        success, node, error_msg = validate_node_exists(node_id, ideas, 'edit', node_index=get_node_index())
         if not success:
             logger.warning(error_msg)
             return standard_response(message, False, 'Node not found')
@@ -414,7 +418,7 @@ def handle_edit_node(message: Message) -> Dict[str, Any]:
         if 'y' in validated_payload:
             node['y'] = validated_payload['y']
 
-        recalc_size(node)
+        recalc_size(node, force=True)
         set_ideas(ideas)
         save_data(get_store())
 
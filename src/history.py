@@ -4,9 +4,36 @@ from typing import List, Dict, Any
 from copy import deepcopy
 import streamlit as st
 
+from src import json_utils
+
 # Maximum number of states to keep in history
 MAX_HISTORY_SIZE = 50
 
+def _snapshot(value: Any) -> Any:
+    """Deep copy plain JSON data through a (C-backed) JSON round trip.
+    
+    Much cheaper than deepcopy for the nested dicts/lists of the store; values
+    that are not JSON serializable fall back to deepcopy.
+    """
+    try:
+        return json_utils.loads(json_utils.dumps_bytes(value))
+    except (TypeError, ValueError):
+        return deepcopy(value)
+
+def _snapshot_ideas(ideas: List[Dict[str, Any]], previous: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Snapshot the ideas list, sharing node snapshots with the previous history entry.
+    
+    History entries are never modified once recorded, so a node that is
+    unchanged since the previous entry reuses that entry's copy instead of
+    being copied again; only new and edited nodes are snapshotted.
+    """
+    previous_by_id = {n.get('id'): n for n in previous if isinstance(n, dict)}
+    snapshot = []
+    for node in ideas:
+        prev_node = previous_by_id.get(node.get('id')) if isinstance(node, dict) else None
+        snapshot.append(prev_node if prev_node is not None and prev_node == node else _snapshot(node))
+    return snapshot
+
 def get_history() -> List[Dict[str, Any]]:
     """Get the history stack from session state."""
     return st.session_state.get('store', {}).get('history', [])
@@ -34,11 +61,12 @@ def save_state_to_history() -> None:
         history = history[:history_index + 1]
     
     # Save current state with all required fields
+    previous_ideas = history[-1].get('ideas', []) if history else []
     current_state = {
-        'ideas': deepcopy(store.get('ideas', [])),
+        'ideas': _snapshot_ideas(store.get('ideas', []), previous_ideas),
         'central': store.get('central'),
         'next_id': store.get('next_id', 0),
-        'settings': deepcopy(store.get('settings', {}))
+        'settings': _snapshot(store.get('settings', {}))
     }
     
     history.append(current_state)
@@ -72,10 +100,10 @@ def perform_undo() -> bool:
     
     # Update current state with proper default values
     store = st.session_state['store']
-    store['ideas'] = deepcopy(previous_state.get('ideas', []))
+    store['ideas'] = _snapshot(previous_state.get('ideas', []))
     store['central'] = previous_state.get('central')
     store['next_id'] = previous_state.get('next_id', 0)  # Default to 0 if not present
-    store['settings'] = deepcopy(previous_state.get('settings', {}))
+    store['settings'] = _snapshot(previous_state.get('settings', {}))
     
     # Update history index
     set_history_index(history_index - 1)
@@ -95,10 +123,10 @@ def perform_redo() -> bool:
     
     # Update current state with proper default values
     store = st.session_state['store']
-    store['ideas'] = deepcopy(next_state.get('ideas', []))
+    store['ideas'] = _snapshot(next_state.get('ideas', []))
     store['central'] = next_state.get('central')
     store['next_id'] = next_state.get('next_id', 0)  # Default to 0 if not present
-    store['settings'] = deepcopy(next_state.get('settings', {}))
+    store['settings'] = _snapshot(next_state.get('settings', {}))
     
     # Update history index
     set_history_index(history_index + 1)
@@ -0,0 +1,71 @@
+"""Fast JSON helpers for the Enhanced Mind Map application.
+
+Uses orjson when it is installed and falls back to the standard library
+json module otherwise. Both paths accept and produce the same JSON.
+"""
+
+import json
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON document from a str or bytes value."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _orjson_option(indent: Optional[int]) -> int:
+    """orjson options matching our dumps() output for the given indent."""
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    if indent == 2:
+        option |= orjson.OPT_INDENT_2
+    return option
+
+def _std_dumps(obj: Any, indent: Optional[int]) -> str:
+    """Serialize with the standard library json module."""
+    if indent is None:
+        # Match orjson's compact output
+        return json.dumps(obj, separators=(',', ':'))
+    return json.dumps(obj, indent=indent)
+
+def dumps_bytes(obj: Any, indent: Optional[int] = None) -> bytes:
+    """Serialize an object to UTF-8 encoded JSON, e.g. for writing to a binary file.
+    
+    Args:
+        obj: Object to serialize
+        indent: Optional indentation; orjson only supports 2 spaces, so other
+            values are handled by the standard library
+        
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None and indent in (None, 2):
+        try:
+            return orjson.dumps(obj, option=_orjson_option(indent))
+        except TypeError:
+            # Types orjson does not handle (e.g. very large ints) go through json
+            pass
+    return _std_dumps(obj, indent).encode('utf-8')
+
+def dumps(obj: Any, indent: Optional[int] = None) -> str:
+    """Serialize an object to a JSON string.
+    
+    Args:
+        obj: Object to serialize
+        indent: Optional indentation; orjson only supports 2 spaces, so other
+            values are handled by the standard library
+        
+    Returns:
+        JSON string
+    """
+    if orjson is not None and indent in (None, 2):
+        try:
+            return orjson.dumps(obj, option=_orjson_option(indent)).decode('utf-8')
+        except TypeError:
+            # Types orjson does not handle (e.g. very large ints) go through json
+            pass
+    return _std_dumps(obj, indent)
@@ -4,13 +4,14 @@ This module defines the standardized message format used for communication
 between the frontend canvas and backend Python components.
 """
 
-import json
 import uuid
 import datetime
 from typing import Dict, Any, Optional, Union
 from dataclasses import dataclass, asdict
 import time
 
+from src import json_utils
+
 @dataclass
 class Message:
     """Standardized message format for frontend-backend communication."""
@@ -66,7 +67,7 @@ class Message:
 
     def to_json(self) -> str:
         """Convert message to JSON string."""
-        return json.dumps(self.to_dict())
+        return json_utils.dumps(self.to_dict())
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Message':
@@ -76,7 +77,7 @@ class Message:
     @classmethod
     def from_json(cls, json_str: str) -> 'Message':
         """Create a message from a JSON string."""
-        return cls.from_dict(json.loads(json_str))
+        return cls.from_dict(json_utils.loads(json_str))
 
 def validate_message(msg_data: Dict[str, Any]) -> bool:
     """Validate message format and content."""
@@ -101,7 +102,7 @@ def validate_message(msg_data: Dict[str, Any]) -> bool:
         # Validate action type
         valid_actions = {
             'canvas_click', 'canvas_dblclick', 'canvas_contextmenu',
-            'new_node', 'create_node', 'edit_node', 'delete', 'delete_node', 'pos', 'reparent',
+            'new_node', 'create_node', 'edit_node', 'delete', 'delete_node', 'pos', 'pos_batch', 'reparent',
             'center_node', 'select_node', 'undo', 'redo'
         }
         if msg_data['action'] not in valid_actions:
@@ -3,6 +3,7 @@ Message queue and retry mechanism for Enhanced Mind Map.
 Handles message queuing, retries, and acknowledgment tracking.
 """
 
+import atexit
 import time
 import threading
 import logging
@@ -48,7 +49,7 @@ except ImportError:
     def save_data(state): pass
 
 from src.message_format import Message, create_response_message
-from src.utils import collect_descendants, find_node_by_id, canvas_to_node_coordinates, node_to_canvas_coordinates
+from src.utils import build_children_index, collect_descendants, find_node_by_id, canvas_to_node_coordinates, node_to_canvas_coordinates
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +71,8 @@ class MessageQueue:
         self._stop_event = threading.Event()
         self._worker_thread = None
         self._callback: Optional[Callable[[Message], Message]] = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
         
     def start(self, callback: Callable[[Message], Message]):
         """Start the message queue worker thread."""
@@ -99,6 +102,24 @@ class MessageQueue:
             else:
                 logger.info("Queue is empty after startup")
         
+    def ensure_started(self, callback: Callable[[Message], Message]) -> bool:
+        """Start the worker thread unless it is already running.
+        
+        The queue is shared by every session in the process, so later
+        sessions (and reruns) reuse the running worker instead of restarting
+        it. The worker is stopped at interpreter exit; that hook is
+        registered once, on the first start. Returns True if the worker was
+        started.
+        """
+        with self._start_lock:
+            if self._worker_thread is not None and self._worker_thread.is_alive():
+                return False
+            self.start(callback)
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+            return True
+        
     def stop(self):
         """Stop the message queue worker thread."""
         if self._worker_thread is None:
@@ -124,6 +145,23 @@ class MessageQueue:
         
         logger.info("Message queue worker thread stopped")
         
+    def drain_and_swap(self) -> int:
+        """Drop all queued messages, keeping the worker thread running.
+        
+        The backing list is swapped for a fresh one under the lock, so the
+        worker never sees a half-cleared queue. Returns the number of
+        messages dropped.
+        """
+        with self._lock:
+            dropped, self.queue = self.queue, []
+        logger.info(f"Message queue drained: {len(dropped)} messages dropped")
+        return len(dropped)
+        
+    def has_pending(self) -> bool:
+        """Check whether any messages are still waiting to be processed."""
+        with self._lock:
+            return bool(self.queue)
+        
     def enqueue(self, message: Message) -> None:
         """Add a message to the queue."""
         with self._lock:
@@ -722,11 +760,11 @@ class MessageQueue:
             # Use utility function to collect all descendants to delete
             to_delete = set()
             
-            # Delete all matching nodes and their descendants
+            # Delete all matching nodes and their descendants, sharing one
+            # parent -> children index across the walks
+            children_index = build_children_index(ideas)
             for mid in matching_ids:
-                # Use utility function to collect descendants for each matching ID
-                node_descendants = collect_descendants(mid, ideas)
-                to_delete.update(node_descendants)
+                collect_descendants(mid, ideas, descendants=to_delete, children_index=children_index)
             
             logger.debug(f"Will delete nodes: {to_delete}")
             
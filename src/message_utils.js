@@ -91,10 +91,15 @@ function sendMessage(message) {
             console.error('URL parameter method failed:', e);
         }
 
-        // Last resort: localStorage
+        // Last resort: BroadcastChannel, or a single localStorage write where
+        // it is unavailable
         try {
-            localStorage.setItem('mindmap_message', JSON.stringify(message));
-            localStorage.setItem('mindmap_trigger_reload', Date.now().toString());
+            if ('BroadcastChannel' in window) {
+                window.__mmChan = window.__mmChan || new BroadcastChannel('mindmap');
+                window.__mmChan.postMessage(message);
+            } else {
+                localStorage.setItem('mindmap_message', JSON.stringify(message));
+            }
             return true;
         } catch (e) {
             console.error('localStorage method failed:', e);
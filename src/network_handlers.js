@@ -605,11 +605,14 @@ function applyStoredPositions(network, positions) {
         let appliedCount = 0;
         let skippedCount = 0;
         
-        // Get all node IDs
-        const nodeIds = network.body.data.nodes.getIds();
+        // Get all node IDs and their current positions in one call
+        const dataNodes = network.body.data.nodes;
+        const nodeIds = dataNodes.getIds();
+        const currentPositions = network.getPositions(nodeIds);
         sendLog('info', `Applying positions to ${nodeIds.length} nodes`);
         
-        // Apply positions to each node
+        // Collect the changed positions, then apply them in one DataSet update
+        const updates = [];
         nodeIds.forEach(nodeId => {
             if (positions[nodeId]) {
                 // Apply position if valid
@@ -617,37 +620,17 @@ function applyStoredPositions(network, positions) {
                 const y = parseFloat(positions[nodeId].y);
                 
                 if (!isNaN(x) && !isNaN(y)) {
-                    // Create a proper position object
-                    const posObj = { x: x, y: y };
-                    
-                    // Apply position to the node and ensure it remains fixed
-                    try {
-                        // Get current network positions for comparison
-                        const currentPos = network.getPositions([nodeId])[nodeId];
-                        if (currentPos && 
-                            (Math.abs(currentPos.x - x) < 0.001 && Math.abs(currentPos.y - y) < 0.001)) {
-                            // Position is already correct, skip
-                            skippedCount++;
-                            return;
-                        }
-                        
-                        // Set the node position
-                        network.moveNode(nodeId, x, y);
-                        
-                        // Also ensure it's stored in the data structure
-                        const nodeData = network.body.data.nodes.get(nodeId);
-                        if (nodeData) {
-                            nodeData.x = x;
-                            nodeData.y = y;
-                            network.body.data.nodes.update(nodeData);
-                        }
-                        
-                        // Log the position application
-                        sendLog('info', `Applied position (${x}, ${y}) to node ${nodeId}`);
-                        appliedCount++;
-                    } catch (e) {
-                        sendLog('error', `Failed to apply position to node ${nodeId}: ${e.message}`);
+                    // Compare against the current network position
+                    const currentPos = currentPositions[nodeId];
+                    if (currentPos && 
+                        (Math.abs(currentPos.x - x) < 0.001 && Math.abs(currentPos.y - y) < 0.001)) {
+                        // Position is already correct, skip
+                        skippedCount++;
+                        return;
                     }
+                    
+                    updates.push({ id: nodeId, x: x, y: y });
+                    appliedCount++;
                 } else {
                     sendLog('warning', `Invalid position values for node ${nodeId}: (${positions[nodeId].x}, ${positions[nodeId].y})`);
                     skippedCount++;
@@ -657,6 +640,10 @@ function applyStoredPositions(network, positions) {
             }
         });
         
+        if (updates.length > 0) {
+            dataNodes.update(updates);
+        }
+        
         sendLog('info', `Position application complete: ${appliedCount} applied, ${skippedCount} skipped`);
         return true;
     } catch (error) {
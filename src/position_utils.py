@@ -1,8 +1,11 @@
 # Position update utilities for MindMap application
+import base64
 import logging
+import numpy as np
 from typing import Dict, Any, List, Optional, Callable, Union, Tuple
 
 from src.utils import find_node_by_id, handle_error
+from src import json_utils
 
 logger = logging.getLogger(__name__)
 
@@ -214,4 +217,29 @@ def handle_position_message(
         return {
             'success': False,
             'message': error_msg
-        } 
\ No newline at end of file
+        }
+
+def encode_node_positions(positions: Dict[str, Any]) -> Tuple[str, str]:
+    """Encode node positions for the browser as an id list plus packed coordinates.
+    
+    Positions at exactly (0, 0) are skipped since they are usually unset defaults.
+    The coordinates are little-endian float64 pairs (x0, y0, x1, y1, ...),
+    base64 encoded, in the same order as the ids; the page decodes them with
+    decodeNodePositions() into a Float64Array.
+    
+    Args:
+        positions: Result of build_position_arrays() / get_node_positions()
+        
+    Returns:
+        Tuple of (JSON array of node IDs, base64 coordinate buffer)
+    """
+    nodes = positions['nodes']
+    xs = positions['xs']
+    ys = positions['ys']
+    keep = [i for i in np.flatnonzero((xs != 0.0) | (ys != 0.0)).tolist() if 'id' in nodes[i]]
+    
+    buf = np.empty(2 * len(keep), dtype='<f8')
+    buf[0::2] = xs[keep]
+    buf[1::2] = ys[keep]
+    ids = [nodes[i]['id'] for i in keep]
+    return json_utils.dumps(ids), base64.b64encode(buf.tobytes()).decode('ascii')
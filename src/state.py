@@ -5,12 +5,34 @@ import json
 import os
 import logging
 import hashlib
-from src.config import DATA_FILE, ERROR_MESSAGES
+import pickle
+import time
+from src import json_utils
+from src.config import DATA_FILE, ERROR_MESSAGES, SAVE_DEBOUNCE_SECONDS
 
 logger = logging.getLogger(__name__)
 
-# Cache for data hashing to prevent redundant saves
+# Digests of the data file and history file contents last written or loaded,
+# to skip rewriting identical data
 _last_save_hash = None
+_last_history_hash = None
+
+# The history list and its last entry as of the last save. History entries
+# are never modified once recorded (new states are appended, or the list is
+# replaced), so while both are the same objects and the length matches the
+# history hasn't changed and needn't be serialized again to find that out
+_last_history_saved = None
+
+def _content_hash(payload):
+    """Digest of serialized data file contents."""
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+# Pickled copy of the data file, trusted only while its mtime matches the JSON's
+PICKLE_CACHE_FILE = DATA_FILE + '.pkl'
+
+# The undo history holds a full copy of the ideas per entry, so it is kept in
+# its own compact JSON file and the data file stays small and readable
+HISTORY_FILE = os.path.splitext(DATA_FILE)[0] + '_history.json'
 
 def get_store():
     """Get the store from session state."""
@@ -34,20 +56,81 @@ def increment_next_id():
     """Increment the next ID in the store."""
     get_store()['next_id'] = get_next_id() + 1
 
+def get_ideas_version():
+    """Get the mutation counter for the ideas list."""
+    return st.session_state.get('_ideas_version', 0)
+
+def _bump_ideas_version():
+    """Mark the ideas list as changed so derived caches are rebuilt."""
+    st.session_state['_ideas_version'] = get_ideas_version() + 1
+
+def _cached_for_ideas(cache_key, build):
+    """Return build(ideas), cached in session_state until the ideas change.
+    
+    The cache keeps a reference to the ideas list it was built from, so a
+    replaced list (undo/redo, import) is always detected by identity.
+    """
+    ideas = get_ideas()
+    version = get_ideas_version()
+    cached = st.session_state.get(cache_key)
+    if cached is None or cached[0] is not ideas or cached[1] != len(ideas) or cached[2] != version:
+        cached = (ideas, len(ideas), version, build(ideas))
+        st.session_state[cache_key] = cached
+    return cached[3]
+
+def get_node_positions():
+    """Get position arrays for the current ideas, rebuilt only when they change."""
+    from src.utils import build_position_arrays
+    return _cached_for_ideas('node_pos_soa', build_position_arrays)
+
+def get_node_columns():
+    """Get the per-field node lists the canvas renders, rebuilt only when the ideas change."""
+    from src.utils import build_node_columns
+    return _cached_for_ideas('node_columns', build_node_columns)
+
+def get_encoded_node_positions():
+    """Get the (ids JSON, base64 coordinates) pair for the page, rebuilt only when the ideas change."""
+    from src.position_utils import encode_node_positions
+    return _cached_for_ideas('node_pos_encoded', lambda ideas: encode_node_positions(get_node_positions()))
+
+def get_children_index():
+    """Get the parent -> children index for the current ideas, rebuilt only when they change."""
+    from src.utils import build_children_index
+    return _cached_for_ideas('children_index', build_children_index)
+
+def get_node_index():
+    """Get the node ID -> node index for the current ideas, rebuilt only when they change."""
+    from src.utils import build_node_indexes
+    return _cached_for_ideas('node_indexes', build_node_indexes)[0]
+
+def get_label_index():
+    """Get the stripped label -> node ID index for the current ideas, rebuilt only when they change."""
+    from src.utils import build_node_indexes
+    return _cached_for_ideas('node_indexes', build_node_indexes)[1]
+
+def get_search_index():
+    """Get the lowercased per-node search strings, rebuilt only when the ideas change."""
+    from src.utils import build_search_index
+    return _cached_for_ideas('search_index', build_search_index)
+
 def get_current_theme():
     """Get the current theme from the store."""
     return get_store().get('current_theme', 'default')
 
 def set_ideas(ideas_list):
     """Set the ideas in the store."""
-    # Import utility function
+    # Import utility functions
     from src.node_utils import validate_node
+    from src.utils import recalc_size
     
-    # Validate each node in the list
+    # Validate each node in the list, making sure it has a size
     validated_ideas = [validate_node(node, get_next_id, increment_next_id) for node in ideas_list]
+    for node in validated_ideas:
+        recalc_size(node)
     
     # Update the store with validated nodes
     get_store()['ideas'] = validated_ideas
+    _bump_ideas_version()
     
 def add_idea(node):
     """Add an idea to the store."""
@@ -55,13 +138,18 @@ def add_idea(node):
     if 'ideas' not in store:
         store['ideas'] = []
     
-    # Import utility function
+    # Import utility functions
     from src.node_utils import validate_node
+    from src.utils import recalc_size
     
-    # Validate the node before adding
+    # Validate the node before adding, making sure it has a size
     validated_node = validate_node(node, get_next_id, increment_next_id)
+    recalc_size(validated_node)
     store['ideas'].append(validated_node)
-    save_data(store)  # Save state changes automatically
+    _bump_ideas_version()
+    # Callers save right after adding, so only mark the store for a deferred
+    # save here instead of writing the file a second time
+    schedule_save()
 
 def set_central(mid):
     """Set the central node ID in the store."""
@@ -80,59 +168,210 @@ def update_idea(node_id, updates):
             node.update(updates)
             break
     store['ideas'] = ideas
-    save_data(store)  # Save state changes automatically
+    _bump_ideas_version()
+    schedule_save()  # Written by the end-of-run flush once the debounce deadline passes
 
 def save_data(data):
-    """Save app data to file."""
+    """Save app data to file, with the undo history in HISTORY_FILE."""
+    global _last_save_hash, _last_history_hash, _last_history_saved
+    
     try:
         # Log what we're about to save
         ideas = data.get('ideas', [])
         logger.debug(f"Saving data with {len(ideas)} nodes")
         
         # Validate positions for all nodes before saving
+        normalized = False
         for node in ideas:
             # Check if node has position data
             if 'x' not in node or 'y' not in node or node['x'] is None or node['y'] is None:
                 logger.warning(f"Node {node.get('id', 'unknown')} missing position data, initializing to (0,0)")
                 node['x'] = 0.0
                 node['y'] = 0.0
+                normalized = True
             
             # Ensure positions are float (not strings or other types)
-            try:
-                node['x'] = float(node['x'])
-                node['y'] = float(node['y'])
-            except (ValueError, TypeError):
-                logger.warning(f"Invalid position values for node {node.get('id', 'unknown')}, resetting to (0,0)")
-                node['x'] = 0.0
-                node['y'] = 0.0
+            if type(node['x']) is not float or type(node['y']) is not float:
+                normalized = True
+                try:
+                    node['x'] = float(node['x'])
+                    node['y'] = float(node['y'])
+                except (ValueError, TypeError):
+                    logger.warning(f"Invalid position values for node {node.get('id', 'unknown')}, resetting to (0,0)")
+                    node['x'] = 0.0
+                    node['y'] = 0.0
+        if normalized:
+            # The nodes were changed in place; rebuild the caches derived from them
+            _bump_ideas_version()
         
         # Log position data for debugging
-        position_data = {node.get('id'): (node.get('x'), node.get('y')) for node in ideas if 'id' in node}
-        logger.debug(f"Node positions before saving: {position_data}")
+        if logger.isEnabledFor(logging.DEBUG):
+            position_data = {node.get('id'): (node.get('x'), node.get('y')) for node in ideas if 'id' in node}
+            logger.debug(f"Node positions before saving: {position_data}")
         
-        # Serialize the data to JSON
-        with open(DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Serialize the data and the history to JSON, skipping the write for
+        # any file that already holds exactly these bytes; a history that is
+        # provably the one saved last time isn't serialized at all
+        saved_data = {k: v for k, v in data.items() if k != 'history'}
+        payload = json_utils.dumps_bytes(saved_data, indent=2)
+        save_hash = _content_hash(payload)
+        data_changed = save_hash != _last_save_hash or not os.path.exists(DATA_FILE)
+        history = data.get('history', [])
+        history_saved = (history, len(history), history[-1] if history else None)
+        if (_last_history_saved is not None and _last_history_saved[0] is history
+                and _last_history_saved[1] == history_saved[1] and _last_history_saved[2] is history_saved[2]
+                and os.path.exists(HISTORY_FILE)):
+            history_payload, history_hash, history_changed = None, _last_history_hash, False
+        else:
+            history_payload = json_utils.dumps_bytes(history)
+            history_hash = _content_hash(history_payload)
+            history_changed = history_hash != _last_history_hash or not os.path.exists(HISTORY_FILE)
+        if not data_changed and not history_changed:
+            _last_history_saved = history_saved
+            _cancel_pending_save()
+            logger.debug("Data unchanged since last save, skipping write")
+            return True
+        if history_changed:
+            _atomic_write(HISTORY_FILE, history_payload)
+            _last_history_hash = history_hash
+        _last_history_saved = history_saved
+        if data_changed:
+            # The mtime stamp alone can't tell two writes within one
+            # timestamp tick apart, so drop the old pickle before the JSON
+            # changes and write the new one only once the JSON is in place
+            _drop_pickle_cache()
+            _atomic_write(DATA_FILE, payload)
+            _last_save_hash = save_hash
+            _write_pickle_cache(saved_data, save_hash)
+        _cancel_pending_save()
         logger.debug("Save complete")
         return True
     except Exception as e:
         logger.error(f"Error saving data: {str(e)}")
         return False
 
+def _atomic_write(path, payload, mode=0o644):
+    """Write bytes to path through a temporary file and os.replace, so readers never see a partial file.
+    
+    The payload goes straight to the file descriptor: os.write rather than
+    a buffered file object, which would only copy it into its buffer first.
+    """
+    tmp_path = path + '.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+
+def _write_pickle_cache(data, content_hash):
+    """Write the pickled fast-load copy of the data file, stamped with the JSON file's mtime.
+    
+    Only the data file's contents are pickled (the history stays in
+    HISTORY_FILE), together with their digest, so loading from the pickle
+    still primes the unchanged-data check in save_data. The file is only
+    readable and writable by its owner.
+    """
+    try:
+        _atomic_write(PICKLE_CACHE_FILE,
+                      pickle.dumps((content_hash, data), protocol=pickle.HIGHEST_PROTOCOL),
+                      mode=0o600)
+        json_mtime = os.stat(DATA_FILE).st_mtime_ns
+        os.utime(PICKLE_CACHE_FILE, ns=(json_mtime, json_mtime))
+    except Exception as e:
+        logger.warning(f"Could not write pickle cache: {str(e)}")
+
+def _drop_pickle_cache():
+    """Remove the pickled copy of the data file, if there is one."""
+    try:
+        os.remove(PICKLE_CACHE_FILE)
+    except FileNotFoundError:
+        pass
+
+def _read_pickle_cache():
+    """Load the (data digest, data) pickled for the data file, or None if it is missing or stale.
+    
+    The pickle is only used while its mtime equals the JSON file's, so edits
+    made to the JSON outside the app always win. Unpickling can run code, so
+    a file that another user owns or could have written is never loaded.
+    """
+    try:
+        pickle_stat = os.stat(PICKLE_CACHE_FILE)
+        if pickle_stat.st_mtime_ns != os.stat(DATA_FILE).st_mtime_ns:
+            return None
+        if hasattr(os, 'getuid') and (pickle_stat.st_uid != os.getuid() or pickle_stat.st_mode & 0o022):
+            logger.warning("Ignoring pickle cache not written by this user")
+            return None
+        with open(PICKLE_CACHE_FILE, 'rb') as f:
+            cached = pickle.load(f)
+        if not isinstance(cached, tuple) or len(cached) != 2 or not isinstance(cached[1], dict):
+            return None
+        return cached
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable pickle cache: {str(e)}")
+        return None
+
+def schedule_save():
+    """Mark the store for saving without writing it immediately.
+    
+    The first call sets a deadline SAVE_DEBOUNCE_SECONDS ahead; further calls
+    before the write is flushed are folded into the same save.
+    """
+    if not st.session_state.get('_pending_save'):
+        st.session_state['_pending_save'] = True
+        st.session_state['_save_deadline'] = time.monotonic() + SAVE_DEBOUNCE_SECONDS
+
+def _cancel_pending_save():
+    """Drop a scheduled save; called once the store has been written anyway."""
+    if st.session_state.get('_pending_save'):
+        st.session_state['_pending_save'] = False
+
+def has_pending_save():
+    """Check whether a scheduled save has not been written yet."""
+    return bool(st.session_state.get('_pending_save'))
+
+def flush_pending_save(force=False):
+    """Write a scheduled save once its deadline has passed (or immediately if forced).
+    
+    Returns:
+        True if the store was written, False otherwise
+    """
+    if not has_pending_save():
+        return False
+    if not force and time.monotonic() < st.session_state.get('_save_deadline', 0):
+        return False
+    st.session_state['_pending_save'] = False
+    return save_data(get_store())
+
 def load_data():
-    """Load data from JSON file if it exists"""
-    global _last_save_hash
+    """Load data from JSON file if it exists, along with the history saved next to it"""
+    global _last_save_hash, _last_history_hash
     
     try:
         if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r') as f:
-                data = json.load(f)
-                
-                # Update the hash cache
-                data_str = json.dumps(data, sort_keys=True)
-                _last_save_hash = hashlib.md5(data_str.encode()).hexdigest()
-                
-                return data
+            cached = _read_pickle_cache()
+            if cached is not None:
+                _last_save_hash, data = cached
+            else:
+                with open(DATA_FILE, 'rb') as f:
+                    payload = f.read()
+                data = json_utils.loads(payload)
+                _last_save_hash = _content_hash(payload)
+            
+            # Older data files carry the history inline; keep it and let
+            # the next save move it to HISTORY_FILE
+            _last_history_hash = None
+            if 'history' not in data and os.path.exists(HISTORY_FILE):
+                with open(HISTORY_FILE, 'rb') as f:
+                    history_payload = f.read()
+                data['history'] = json_utils.loads(history_payload)
+                _last_history_hash = _content_hash(history_payload)
+            
+            return data
         logger.info("Data file not found, using default settings")
         return None
     except json.JSONDecodeError as e:
@@ -3,14 +3,14 @@ if (typeof window !== 'undefined') {
     // Immediately define Streamlit namespace using IIFE to prevent syntax errors
     (function initStreamlit() {
         try {
-            // Define Streamlit namespace if it doesn't exist
-            if (typeof window.Streamlit === 'undefined') {
-                window.Streamlit = { 
-                    setComponentValue: function() { console.log('Streamlit mock: setComponentValue called'); },
-                    setComponentReady: function() { console.log('Streamlit mock: setComponentReady called'); },
-                    receiveMessageFromPython: function() { console.log('Streamlit mock: receiveMessageFromPython called'); }
+            // Define Streamlit namespace if it doesn't exist, with one shared no-op
+            if (!window.Streamlit) {
+                const _noop = () => {};
+                window.Streamlit = {
+                    setComponentValue: _noop,
+                    setComponentReady: _noop,
+                    receiveMessageFromPython: _noop
                 };
-                console.log('Created Streamlit namespace mock to prevent errors');
             }
         } catch (e) {
             console.error('Error initializing Streamlit namespace:', e);
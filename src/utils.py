@@ -1,10 +1,12 @@
 # Utility functions for MindMap
 import streamlit as st
 from src.themes import URGENCY_SIZE, TAGS, THEMES, PRIMARY_NODE_BORDER, RGBA_ALPHA
+from src.config import CLICK_THRESHOLD_RATIO
 import functools
 import logging
 import colorsys
 import re
+import numpy as np
 from typing import Union, List, Dict, Any, Optional, Set, Tuple
 
 # Cache for memoization
@@ -15,29 +17,85 @@ def clear_size_cache():
     global _size_cache
     _size_cache = {}
 
-def collect_descendants(node_id, ideas, descendants=None):
-    """Recursively collect all descendants of a node.
+def build_children_index(ideas: List[Dict[str, Any]]) -> Dict[Any, List[Any]]:
+    """Map each parent ID to the IDs of its direct children.
+    
+    Args:
+        ideas: List of all nodes
+        
+    Returns:
+        Dictionary of parent ID -> list of child node IDs
+    """
+    children = {}
+    for n in ideas:
+        if 'id' in n and n.get('parent') is not None:
+            children.setdefault(n['parent'], []).append(n['id'])
+    return children
+
+def build_search_index(ideas: List[Dict[str, Any]]) -> List[str]:
+    """Build one lowercased search string per node, in the order of ideas.
+    
+    Label, description and tag are joined with NUL separators so that a
+    query cannot match across two fields.
+    
+    Args:
+        ideas: List of all nodes
+        
+    Returns:
+        List of lowercased search strings, one per node
+    """
+    return [
+        f"{n.get('label', 'Untitled Node')}\0{n.get('description') or ''}\0{n.get('tag') or ''}".lower()
+        for n in ideas
+    ]
+
+def build_node_indexes(ideas: List[Dict[str, Any]]) -> Tuple[Dict[Any, Dict[str, Any]], Dict[str, Any]]:
+    """Map node IDs to nodes and stripped labels to node IDs.
+    
+    When several nodes share a label, the first one wins, as with a linear scan.
+    
+    Args:
+        ideas: List of all nodes
+        
+    Returns:
+        Tuple of (node ID -> node, stripped label -> node ID)
+    """
+    by_id = {}
+    id_by_label = {}
+    for n in ideas:
+        if 'id' not in n:
+            continue
+        by_id.setdefault(n['id'], n)
+        id_by_label.setdefault(n.get('label', '').strip(), n['id'])
+    return by_id, id_by_label
+
+def collect_descendants(node_id, ideas, descendants=None, children_index=None):
+    """Collect all descendants of a node.
     
     Args:
         node_id: ID of the starting node
         ideas: List of all nodes
-        descendants: Optional set to collect descendant IDs (used for recursion)
+        descendants: Optional set to add descendant IDs to
+        children_index: Optional parent -> children map from build_children_index
         
     Returns:
         Set of node IDs including the starting node and all descendants
     """
     if descendants is None:
         descendants = set()
+    if children_index is None:
+        children_index = build_children_index(ideas)
     
     descendants.add(node_id)
     
-    # Find all children of this node
-    children = [n for n in ideas if 'id' in n and n.get('parent') == node_id]
-    
-    # Recursively add descendants
-    for child in children:
-        if child['id'] not in descendants:  # Avoid cycles
-            collect_descendants(child['id'], ideas, descendants)
+    # Walk the subtree, skipping nodes already seen (avoids cycles)
+    pending = [node_id]
+    while pending:
+        current = pending.pop()
+        for child_id in children_index.get(current, ()):
+            if child_id not in descendants:
+                descendants.add(child_id)
+                pending.append(child_id)
     
     return descendants
 
@@ -70,16 +128,26 @@ def compare_node_ids(id1: Any, id2: Any) -> bool:
     # IDs are not equivalent
     return False
 
-def find_node_by_id(ideas: List[Dict[str, Any]], node_id: Any) -> Optional[Dict[str, Any]]:
+def find_node_by_id(ideas: List[Dict[str, Any]], node_id: Any,
+                    node_index: Optional[Dict[Any, Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
     """Find a node by its ID with flexible type handling.
     
     Args:
         ideas: List of all nodes
         node_id: ID to search for (can be string, int, etc.)
+        node_index: Optional ID -> node map for ideas from build_node_indexes;
+            an exact ID match is looked up there before scanning
         
     Returns:
         The node dictionary if found, or None if not found
     """
+    if node_index is not None:
+        try:
+            node = node_index.get(node_id)
+        except TypeError:  # Unhashable ID; only the scan can match it
+            node = None
+        if node is not None:
+            return node
     for node in ideas:
         if 'id' in node and compare_node_ids(node['id'], node_id):
             return node
@@ -123,8 +191,63 @@ def node_to_canvas_coordinates(node_x: Union[int, float], node_y: Union[int, flo
     canvas_y = float(node_y) + float(canvas_height)/2
     return canvas_x, canvas_y
 
+def build_position_arrays(ideas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build a structure-of-arrays view of the nodes that have stored positions.
+    
+    Args:
+        ideas: List of all nodes
+        
+    Returns:
+        Dictionary with 'nodes' (the positioned node dicts) and parallel
+        'xs' / 'ys' float arrays of their coordinates
+    """
+    nodes = [n for n in ideas if n.get('x') is not None and n.get('y') is not None]
+    return {
+        'nodes': nodes,
+        'xs': np.fromiter((float(n['x']) for n in nodes), dtype=np.float64, count=len(nodes)),
+        'ys': np.fromiter((float(n['y']) for n in nodes), dtype=np.float64, count=len(nodes))
+    }
+
+def build_node_columns(ideas: List[Dict[str, Any]]) -> Dict[str, list]:
+    """Build a structure-of-arrays view of the node fields the canvas renders.
+    
+    Nodes without an id are left out. The hover title (tag, label and
+    description) is assembled here too, since it only depends on the node.
+    
+    Args:
+        ideas: List of all nodes
+        
+    Returns:
+        Dictionary of parallel lists: 'ids', 'labels', 'titles', 'tags',
+        'urgencies' (None when unset), 'color_urgencies' ('medium' when the
+        key is missing), 'parents', 'edge_types', 'xs', 'ys' and 'sizes'
+    """
+    nodes = [n for n in ideas if 'id' in n]
+    titles = []
+    for n in nodes:
+        title = n['label']
+        if n.get('tag'):
+            title = f"[{n['tag']}] {title}"
+        if n.get('description'):
+            title += f"\n\n{n['description']}"
+        titles.append(title)
+    return {
+        'ids': [n['id'] for n in nodes],
+        'labels': [n['label'] for n in nodes],
+        'titles': titles,
+        'tags': [n.get('tag') for n in nodes],
+        'urgencies': [n.get('urgency') for n in nodes],
+        'color_urgencies': [n.get('urgency', 'medium') for n in nodes],
+        'parents': [n.get('parent') for n in nodes],
+        'edge_types': [n.get('edge_type', 'default') for n in nodes],
+        'xs': [n['x'] for n in nodes],
+        'ys': [n['y'] for n in nodes],
+        'sizes': [n.get('size', 20) for n in nodes]  # Default size of 20 if not set
+    }
+
 def find_closest_node(ideas: List[Dict[str, Any]], click_x: Union[int, float], click_y: Union[int, float],
-                      canvas_width: Union[int, float], canvas_height: Union[int, float]) -> Tuple[Optional[Dict[str, Any]], float, float]:
+                      canvas_width: Union[int, float], canvas_height: Union[int, float],
+                      positions: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Dict[str, Any]], float, float]:
     """Find the closest node to the given click coordinates.
     
     Args:
@@ -133,6 +256,7 @@ def find_closest_node(ideas: List[Dict[str, Any]], click_x: Union[int, float], c
         click_y: Y coordinate on the canvas
         canvas_width: Width of the canvas 
         canvas_height: Height of the canvas
+        positions: Optional precomputed result of build_position_arrays(ideas)
         
     Returns:
         Tuple of (closest_node, min_distance, click_threshold) where:
@@ -142,41 +266,39 @@ def find_closest_node(ideas: List[Dict[str, Any]], click_x: Union[int, float], c
     """
     logger = logging.getLogger(__name__)
     
+    if positions is None:
+        positions = build_position_arrays(ideas)
+    
     # Find the nearest node
     closest_node = None
     min_distance = float('inf')
     
-    # Filter nodes with valid positions
-    nodes_with_pos = [n for n in ideas if n.get('x') is not None and n.get('y') is not None]
-    
-    for node in nodes_with_pos:
-        # Scale coordinates to match canvas
-        node_x = node.get('x', 0)
-        node_y = node.get('y', 0)
-        
-        node_canvas_x, node_canvas_y = node_to_canvas_coordinates(node_x, node_y, canvas_width, canvas_height)
-        
-        # Calculate Euclidean distance
-        distance = ((node_canvas_x - click_x) ** 2 + (node_canvas_y - click_y) ** 2) ** 0.5
-        
-        logger.debug(f"Node {node.get('id')} distance from click: {distance:.2f}")
-        
-        if distance < min_distance:
-            min_distance = distance
-            closest_node = node
+    nodes = positions['nodes']
+    if nodes:
+        # Node (0,0) maps to the canvas center, so move the click into node space
+        # once instead of converting every node to canvas space
+        node_click_x, node_click_y = canvas_to_node_coordinates(click_x, click_y, canvas_width, canvas_height)
+        dx = positions['xs'] - node_click_x
+        dy = positions['ys'] - node_click_y
+        d2 = dx * dx + dy * dy
+        i = int(np.argmin(d2))
+        closest_node = nodes[i]
+        min_distance = float(d2[i]) ** 0.5
     
     # Calculate threshold based on canvas dimensions and node size
-    base_threshold = min(canvas_width, canvas_height) * 0.08  # 8% of the smallest dimension
+    base_threshold = min(canvas_width, canvas_height) * CLICK_THRESHOLD_RATIO
     node_size = closest_node.get('size', 20) if closest_node else 20
     click_threshold = base_threshold + node_size
     
     if closest_node:
-        logger.debug(f"Closest node: {closest_node.get('id')} at distance {min_distance:.2f}, threshold: {click_threshold:.2f}")
+        logger.debug("Closest node: %s at distance %.2f, threshold: %.2f",
+                     closest_node.get('id'), min_distance, click_threshold)
     
     return closest_node, min_distance, click_threshold
 
+@functools.lru_cache(maxsize=128)
 def hex_to_rgb(color_str):
-    """Convert hex or HSL color to RGB."""
+    """Convert hex or HSL color to RGB (cached; colors repeat across nodes)."""
     logger = logging.getLogger(__name__)
     
     # Handle HSL format
@@ -205,9 +327,41 @@ def get_theme(theme_name=None):
     theme_name = theme_name or get_current_theme()
     return THEMES.get(theme_name, THEMES['default'])
 
-def recalc_size(node):
-    """Calculate node size based on label length and urgency, with memoization."""
-    if 'size' not in node:
+# Selectbox options that only depend on the static theme and tag tables;
+# tag options are none, then the built-in tags (custom tags follow)
+TAG_OPTIONS = ('',) + tuple(TAGS)
+THEME_OPTIONS = tuple(THEMES)
+_TAG_INDEX = {tag: i for i, tag in enumerate(TAG_OPTIONS)}
+
+def tag_option_index(tag, custom_tags):
+    """Position of tag in TAG_OPTIONS followed by custom_tags, or 0 if it isn't there."""
+    index = _TAG_INDEX.get(tag)
+    if index is None:
+        index = len(TAG_OPTIONS) + custom_tags.index(tag) if tag in custom_tags else 0
+    return index
+
+@functools.lru_cache(maxsize=8)
+def theme_options(theme_name):
+    """Urgency levels and edge types of a theme, each with an option -> index map."""
+    theme = get_theme(theme_name)
+    urgencies = tuple(theme['urgency_colors'])
+    edge_types = tuple(theme['edge_colors'])
+    return (urgencies, {u: i for i, u in enumerate(urgencies)},
+            edge_types, {e: i for i, e in enumerate(edge_types)})
+
+@functools.lru_cache(maxsize=16)
+def px_to_int(size):
+    """Convert a CSS pixel size such as '650px' to an int."""
+    return int(size[:-2]) if size.endswith('px') else int(size)
+
+def recalc_size(node, force=False):
+    """Calculate node size based on label length and urgency, with memoization.
+    
+    Nodes that already have a size keep it unless force is set, so this is
+    cheap to call on every node a store update touches; edits that change
+    the label or urgency pass force=True.
+    """
+    if force or 'size' not in node:
         # Create a cache key from label and urgency
         label = node.get('label', '')
         urgency = node.get('urgency', 'medium')
@@ -324,7 +478,8 @@ def handle_error(e: Exception, logger: Optional[logging.Logger] = None,
     
     return error_msg 
 
-def validate_node_exists(node_id: Any, ideas: List[Dict[str, Any]], action_name: str = "operation") -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+def validate_node_exists(node_id: Any, ideas: List[Dict[str, Any]], action_name: str = "operation",
+                         node_index: Optional[Dict[Any, Dict[str, Any]]] = None) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
     """Validate that a node with the given ID exists.
     
     A common pattern in handlers for validating node existence before performing actions.
@@ -333,6 +488,7 @@ def validate_node_exists(node_id: Any, ideas: List[Dict[str, Any]], action_name:
         node_id: ID of the node to validate
         ideas: List of all nodes
         action_name: Name of the action being performed (for error message)
+        node_index: Optional ID -> node map for ideas, passed on to find_node_by_id
         
     Returns:
         Tuple of (success, node, error_message) where:
@@ -340,7 +496,7 @@ def validate_node_exists(node_id: Any, ideas: List[Dict[str, Any]], action_name:
         - node: The node if found, None otherwise
         - error_message: Error message if node doesn't exist, None otherwise
     """
-    node = find_node_by_id(ideas, node_id)
+    node = find_node_by_id(ideas, node_id, node_index=node_index)
     
     if node:
         return True, node, None
@@ -1,6 +1,7 @@
 import unittest
 from src.message_format import Message, validate_message, create_response_message
 from src.message_queue import message_queue, st
+from src.handlers import is_circular
 import time
 import threading
 
@@ -162,5 +163,37 @@ class TestMessageHandling(unittest.TestCase):
                     
             self.assertTrue(found_response, "No valid response message found")
 
+class TestIsCircular(unittest.TestCase):
+    """Test suite for parent cycle detection in is_circular."""
+    
+    def setUp(self):
+        """Create a chain 1 <- 2 <- 3 and a separate root 4."""
+        self.nodes = [
+            {'id': 1, 'parent': None},
+            {'id': 2, 'parent': 1},
+            {'id': 3, 'parent': 2},
+            {'id': 4, 'parent': None}
+        ]
+        self.node_index = {n['id']: n for n in self.nodes}
+    
+    def test_cycles_detected(self):
+        """Reparenting a node under itself or a descendant is circular, with or without the index."""
+        for node_index in (None, self.node_index):
+            self.assertTrue(is_circular(1, 1, self.nodes, node_index=node_index))
+            self.assertTrue(is_circular(1, 3, self.nodes, node_index=node_index))
+            self.assertTrue(is_circular(2, 3, self.nodes, node_index=node_index))
+    
+    def test_valid_reparent(self):
+        """Reparenting under an unrelated node or an ancestor is allowed."""
+        for node_index in (None, self.node_index):
+            self.assertFalse(is_circular(3, 4, self.nodes, node_index=node_index))
+            self.assertFalse(is_circular(3, 1, self.nodes, node_index=node_index))
+            self.assertFalse(is_circular(4, 99, self.nodes, node_index=node_index))
+    
+    def test_existing_loop_terminates(self):
+        """A parent chain that already loops is reported instead of walked forever."""
+        looped = [{'id': 1, 'parent': 2}, {'id': 2, 'parent': 1}, {'id': 3, 'parent': None}]
+        self.assertTrue(is_circular(3, 1, looped, node_index={n['id']: n for n in looped}))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
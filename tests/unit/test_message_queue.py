@@ -121,6 +121,69 @@ class SimpleQueueTest(unittest.TestCase):
         for i, msg in enumerate(test_messages):
             self.assertEqual(processed_messages[i], msg)
 
+class DrainAndSwapTest(unittest.TestCase):
+    """Test suite for MessageQueue.drain_and_swap and has_pending."""
+    
+    def setUp(self):
+        """Create a MessageQueue without starting its worker thread."""
+        from src.message_queue import MessageQueue
+        self.queue = MessageQueue()
+        
+    def test_drain_and_swap(self):
+        """Test dropping queued messages.
+        
+        Verifies that:
+        - The number of dropped messages is returned
+        - The queue is empty afterwards and backed by a fresh list
+        - Messages enqueued after the drain are kept
+        """
+        for i in range(3):
+            self.queue.enqueue(MagicMock(message_id=i))
+        self.assertTrue(self.queue.has_pending())
+        old_backing = self.queue.queue
+        
+        self.assertEqual(self.queue.drain_and_swap(), 3)
+        self.assertFalse(self.queue.has_pending())
+        self.assertIsNot(self.queue.queue, old_backing)
+        self.assertEqual(len(old_backing), 3)
+        
+        self.queue.enqueue(MagicMock(message_id=4))
+        self.assertEqual(len(self.queue.queue), 1)
+        self.assertEqual(self.queue.drain_and_swap(), 1)
+        self.assertEqual(self.queue.drain_and_swap(), 0)
+
+class EnsureStartedTest(unittest.TestCase):
+    """Test suite for MessageQueue.ensure_started."""
+    
+    def setUp(self):
+        """Create a MessageQueue without starting its worker thread."""
+        from src.message_queue import MessageQueue
+        self.queue = MessageQueue()
+        
+    def tearDown(self):
+        """Stop the worker thread started by the test."""
+        self.queue.stop()
+        
+    def test_starts_once(self):
+        """Test that only the first call starts the worker.
+        
+        Verifies that:
+        - The first call starts the worker and registers one exit hook
+        - Later calls keep the running worker thread
+        - A stopped worker is started again, without a second exit hook
+        """
+        with patch('src.message_queue.atexit.register') as register_mock:
+            self.assertTrue(self.queue.ensure_started(lambda message: message))
+            worker = self.queue._worker_thread
+            self.assertTrue(worker.is_alive())
+            
+            self.assertFalse(self.queue.ensure_started(lambda message: message))
+            self.assertIs(self.queue._worker_thread, worker)
+            
+            self.queue.stop()
+            self.assertTrue(self.queue.ensure_started(lambda message: message))
+            register_mock.assert_called_once_with(self.queue.stop)
+
 class SimpleQueue:
     """A minimal message queue implementation for testing.
     
@@ -1,7 +1,9 @@
 import unittest
 import json
 import os
+import shutil
 import sys
+import tempfile
 import time
 from unittest.mock import patch, MagicMock
 
@@ -12,6 +14,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.message_format import Message
 from src.message_queue import message_queue
 from src.state import get_ideas, set_ideas, get_store, save_data
+from src import state
 
 # Create static method for the mock to avoid self parameter issues
 @staticmethod
@@ -299,5 +302,135 @@ class TestNodePosition(unittest.TestCase):
         # Verify save_data was called
         self.save_data_mock.assert_called_once()
 
+class TestDataPersistence(unittest.TestCase):
+    """Test suite for save_data/load_data and the files they keep"""
+    
+    def setUp(self):
+        """Point the data, history and pickle files at a temporary directory"""
+        self.tmp_dir = tempfile.mkdtemp()
+        data_file = os.path.join(self.tmp_dir, 'mindmap_data.json')
+        self.files_patch = patch.multiple(
+            state,
+            DATA_FILE=data_file,
+            HISTORY_FILE=os.path.join(self.tmp_dir, 'mindmap_data_history.json'),
+            PICKLE_CACHE_FILE=data_file + '.pkl',
+            _last_save_hash=None,
+            _last_history_hash=None,
+            _last_history_saved=None
+        )
+        self.files_patch.start()
+        self.data = {
+            'ideas': [{'id': 1, 'label': 'Root', 'parent': None, 'x': 10.0, 'y': 20.0}],
+            'central': 1,
+            'next_id': 2,
+            'history': [{'ideas': [], 'central': None, 'next_id': 1, 'settings': {}}],
+            'history_index': 0
+        }
+        
+    def tearDown(self):
+        """Restore the file paths and remove the temporary directory"""
+        self.files_patch.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        
+    def test_load_uses_pickle_then_json(self):
+        """Saves keep a fresh pickle that load_data uses; without one it falls back to the JSON files"""
+        state.save_data(self.data)
+        self.assertTrue(os.path.exists(state.PICKLE_CACHE_FILE))
+        
+        # Cache hit: same data, only the history is parsed from JSON
+        with patch.object(state.json_utils, 'loads', wraps=state.json_utils.loads) as loads_mock:
+            self.assertEqual(state.load_data(), self.data)
+            self.assertEqual(loads_mock.call_count, 1)
+        
+        # A data change rewrites the pickle along with the JSON
+        self.data['ideas'][0]['label'] = 'Renamed'
+        state.save_data(self.data)
+        self.assertEqual(state._read_pickle_cache()[1]['ideas'][0]['label'], 'Renamed')
+        self.assertEqual(state.load_data()['ideas'][0]['label'], 'Renamed')
+        
+        # Cache miss: parsed from JSON, history merged, no pickle written
+        os.remove(state.PICKLE_CACHE_FILE)
+        with patch.object(state.json_utils, 'loads', wraps=state.json_utils.loads) as loads_mock:
+            self.assertEqual(state.load_data(), self.data)
+            self.assertEqual(loads_mock.call_count, 2)
+        self.assertFalse(os.path.exists(state.PICKLE_CACHE_FILE))
+        
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX file permissions only")
+    def test_load_ignores_writable_pickle(self):
+        """A pickle that other users could have written is never unpickled"""
+        state.save_data(self.data)
+        os.chmod(state.PICKLE_CACHE_FILE, 0o666)
+        with patch.object(state.pickle, 'load') as load_mock:
+            self.assertEqual(state.load_data(), self.data)
+            load_mock.assert_not_called()
+        
+    def test_load_ignores_unreadable_pickle(self):
+        """A corrupt pickle is ignored in favour of the JSON file"""
+        state.save_data(self.data)
+        with open(state.PICKLE_CACHE_FILE, 'wb') as f:
+            f.write(b'not a pickle')
+        json_mtime = os.stat(state.DATA_FILE).st_mtime_ns
+        os.utime(state.PICKLE_CACHE_FILE, ns=(json_mtime, json_mtime))
+        self.assertEqual(state.load_data(), self.data)
+        
+    def test_unchanged_data_not_rewritten(self):
+        """Saving the same content again writes nothing"""
+        state.save_data(self.data)
+        with patch.object(state, '_atomic_write', wraps=state._atomic_write) as write_mock:
+            self.assertTrue(state.save_data(self.data))
+            write_mock.assert_not_called()
+            
+            # A position change rewrites the data file but not the history
+            self.data['ideas'][0]['x'] = 30.0
+            self.assertTrue(state.save_data(self.data))
+            written = [c.args[0] for c in write_mock.call_args_list]
+            self.assertEqual(written, [state.DATA_FILE, state.PICKLE_CACHE_FILE])
+            
+    def test_history_saved_to_separate_file(self):
+        """The undo history goes to HISTORY_FILE, the rest to DATA_FILE"""
+        self.assertTrue(state.save_data(self.data))
+        with open(state.DATA_FILE) as f:
+            saved = json.load(f)
+        with open(state.HISTORY_FILE) as f:
+            history = json.load(f)
+        self.assertNotIn('history', saved)
+        self.assertEqual(saved['ideas'], self.data['ideas'])
+        self.assertEqual(history, self.data['history'])
+        
+    def test_save_cancels_scheduled_save(self):
+        """An explicit save leaves no debounced save pending"""
+        state.schedule_save()
+        self.assertTrue(state.has_pending_save())
+        self.assertTrue(state.save_data(self.data))
+        self.assertFalse(state.has_pending_save())
+        self.assertFalse(state.flush_pending_save(force=True))
+            
+    def test_invalid_positions_normalized(self):
+        """Missing or invalid coordinates are saved as (0, 0)"""
+        self.data['ideas'].append({'id': 2, 'label': 'Child', 'parent': 1, 'x': None, 'y': 'bad'})
+        state.save_data(self.data)
+        with open(state.DATA_FILE) as f:
+            saved = json.load(f)
+        self.assertEqual((saved['ideas'][1]['x'], saved['ideas'][1]['y']), (0.0, 0.0))
+        
+    def test_normalizing_positions_bumps_ideas_version(self):
+        """Rewriting coordinates in place invalidates the caches derived from the ideas"""
+        state.save_data(self.data)
+        version = state.get_ideas_version()
+        state.save_data(self.data)
+        self.assertEqual(state.get_ideas_version(), version)
+        
+        self.data['ideas'][0]['x'] = None
+        state.save_data(self.data)
+        self.assertEqual(state.get_ideas_version(), version + 1)
+        self.assertEqual(self.data['ideas'][0]['x'], 0.0)
+            
+    def test_load_inline_history(self):
+        """Older data files with the history inline still load it"""
+        with open(state.DATA_FILE, 'w') as f:
+            json.dump(self.data, f)
+        self.assertEqual(state.load_data(), self.data)
+        self.assertFalse(os.path.exists(state.PICKLE_CACHE_FILE))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
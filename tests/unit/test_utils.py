@@ -3,6 +3,12 @@ from unittest.mock import MagicMock
 import pytest
 from typing import Dict, Any, Optional
 import unittest
+import json
+
+from src import json_utils
+from src.history import _snapshot_ideas
+from src.utils import (build_children_index, build_node_indexes, build_position_arrays,
+                       collect_descendants, find_closest_node, recalc_size)
 
 class MockSessionState(dict):
     """Mock implementation of Streamlit's session state.
@@ -282,5 +288,134 @@ class TestUtils(unittest.TestCase):
         central = get_test_central()
         self.assertEqual(central, 1)
         
+def _sample_tree():
+    """A small tree for the node helpers: 1 -> (2, 3), 2 -> 4, with 4 unpositioned."""
+    return [
+        {'id': 1, 'label': 'Root', 'parent': None, 'x': 0.0, 'y': 0.0},
+        {'id': 2, 'label': ' Child ', 'parent': 1, 'x': 100.0, 'y': 0.0},
+        {'id': 3, 'label': 'Child', 'parent': 1, 'x': -100.0, 'y': 50.0},
+        {'id': 4, 'label': 'Leaf', 'parent': 2, 'x': None, 'y': None}
+    ]
+
+class TestFindClosestNode(unittest.TestCase):
+    """Test cases for the vectorized closest-node search."""
+    
+    def setUp(self):
+        self.ideas = _sample_tree()
+    
+    def test_find_closest_node(self):
+        """The vectorized search matches a plain distance scan and skips unpositioned nodes."""
+        positions = build_position_arrays(self.ideas)
+        self.assertEqual([n['id'] for n in positions['nodes']], [1, 2, 3])
+        
+        # Canvas (500, 250) on a 800x400 canvas is node space (100, 50)
+        for kwargs in ({}, {'positions': positions}):
+            node, distance, threshold = find_closest_node(self.ideas, 500, 250, 800, 400, **kwargs)
+            self.assertEqual(node['id'], 2)
+            self.assertAlmostEqual(distance, 50.0)
+            self.assertGreater(threshold, 0)
+    
+    def test_find_closest_node_without_positions(self):
+        """No positioned nodes means no closest node."""
+        node, distance, _ = find_closest_node([{'id': 1}], 10, 10, 800, 400)
+        self.assertIsNone(node)
+        self.assertEqual(distance, float('inf'))
+
+class TestDescendants(unittest.TestCase):
+    """Test cases for the children index and descendant walks."""
+    
+    def setUp(self):
+        self.ideas = _sample_tree()
+    
+    def test_build_children_index(self):
+        """Each parent maps to its direct children, in list order."""
+        children = build_children_index(self.ideas)
+        self.assertEqual(children, {1: [2, 3], 2: [4]})
+    
+    def test_collect_descendants(self):
+        """The whole subtree is collected, with or without a prebuilt index."""
+        self.assertEqual(collect_descendants(1, self.ideas), {1, 2, 3, 4})
+        children = build_children_index(self.ideas)
+        self.assertEqual(collect_descendants(2, self.ideas, children_index=children), {2, 4})
+        
+        # A cycle in the parent links must not loop forever
+        cyclic = [{'id': 1, 'parent': 2}, {'id': 2, 'parent': 1}]
+        self.assertEqual(collect_descendants(1, cyclic), {1, 2})
+    
+    def test_collect_descendants_deep_chain(self):
+        """A chain deeper than the recursion limit is walked iteratively."""
+        depth = sys.getrecursionlimit() + 100
+        chain = [{'id': i, 'parent': i - 1 if i else None} for i in range(depth)]
+        self.assertEqual(len(collect_descendants(0, chain)), depth)
+
+class TestJsonUtils(unittest.TestCase):
+    """Test cases for the src.json_utils helpers."""
+    
+    def test_round_trip(self):
+        """Data survives dumps/loads, as str and as bytes, compact and indented."""
+        data = {'ideas': [{'id': 1, 'label': 'Ünïcode', 'x': 1.5, 'parent': None}], 'ok': True}
+        self.assertEqual(json_utils.loads(json_utils.dumps(data)), data)
+        self.assertEqual(json_utils.loads(json_utils.dumps_bytes(data)), data)
+        self.assertEqual(json_utils.loads(json_utils.dumps_bytes(data, indent=2)), data)
+        self.assertIsInstance(json_utils.dumps_bytes(data), bytes)
+        self.assertNotIn(' ', json_utils.dumps({'a': [1, 2]}))
+    
+    def test_non_str_keys(self):
+        """Non-string keys are written as strings, as the json module does."""
+        self.assertEqual(json_utils.loads(json_utils.dumps({1: 'a', 2.5: 'b'})), {'1': 'a', '2.5': 'b'})
+    
+    def test_matches_json_module(self):
+        """Parsed output is the same as the standard library's."""
+        data = {'nested': {'list': [1, 2, {'k': None}]}, 'n': -3}
+        self.assertEqual(json_utils.loads(json_utils.dumps(data, indent=2)),
+                         json.loads(json.dumps(data, indent=2)))
+
+class TestNodeIndexes(unittest.TestCase):
+    """Test cases for the id and label indexes."""
+    
+    def test_build_node_indexes(self):
+        """IDs map to nodes; stripped labels map to the first node using them."""
+        ideas = _sample_tree()
+        by_id, id_by_label = build_node_indexes(ideas + [{'label': 'No id'}])
+        self.assertIs(by_id[3], ideas[2])
+        self.assertEqual(len(by_id), 4)
+        self.assertEqual(id_by_label['Child'], 2)
+        self.assertNotIn('No id', id_by_label)
+
+class TestHistorySnapshots(unittest.TestCase):
+    """Test cases for history snapshot sharing."""
+    
+    def test_snapshot_ideas_shares_unchanged_nodes(self):
+        """Unchanged nodes reuse the previous snapshot; edited and new nodes are copied."""
+        ideas = [{'id': 1, 'label': 'A'}, {'id': 2, 'label': 'B'}]
+        first = _snapshot_ideas(ideas, [])
+        self.assertEqual(first, ideas)
+        self.assertIsNot(first[0], ideas[0])
+        
+        ideas[1]['label'] = 'B2'
+        ideas.append({'id': 3, 'label': 'C'})
+        second = _snapshot_ideas(ideas, first)
+        self.assertIs(second[0], first[0])
+        self.assertIsNot(second[1], first[1])
+        self.assertEqual(second[1]['label'], 'B2')
+        self.assertEqual(first[1]['label'], 'B')
+        self.assertIsNot(second[2], ideas[2])
+        self.assertEqual(second, ideas)
+
+class TestRecalcSize(unittest.TestCase):
+    """Test cases for node size recalculation."""
+    
+    def test_recalc_size_force(self):
+        """An existing size is kept unless force is set."""
+        node = {'label': 'A much longer label than before', 'urgency': 'high', 'size': 1.0}
+        recalc_size(node)
+        self.assertEqual(node['size'], 1.0)
+        recalc_size(node, force=True)
+        self.assertNotEqual(node['size'], 1.0)
+        
+        fresh = {'label': 'A much longer label than before', 'urgency': 'high'}
+        recalc_size(fresh)
+        self.assertEqual(fresh['size'], node['size'])
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file